@@ -0,0 +1,109 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+
+from app.api import dependencies as deps
+from app.core import memory
+from app.core.config import settings
+from app.core.startup import components
+from app.rag.query_cache import get_query_cache
+from app.rag.reindex import load_job, reindex_manager
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(deps.require_admin_token)])
+
+@router.post("/reindex", status_code=202, tags=["Admin"])
+def start_reindex(scope: str = "full"):
+    """Start a background re-index; chat keeps using the active version until the new one is validated.
+    scope=catalogue only re-embeds the products changed since the active version was built."""
+    try:
+        job = reindex_manager.start(scope)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return load_job(job.id)
+
+@router.get("/reindex", tags=["Admin"])
+def reindex_status():
+    """Active version, version history and recent re-index jobs"""
+    return reindex_manager.status()
+
+@router.get("/reindex/{job_id}", tags=["Admin"])
+def reindex_job(job_id: str):
+    job = load_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job re-index {job_id} tidak ditemukan")
+    return job
+
+@router.post("/reindex/rollback", tags=["Admin"])
+async def rollback_reindex():
+    """Re-activate the version that was active before the current one"""
+    try:
+        version = await run_in_threadpool(reindex_manager.rollback)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"active": version}
+
+@router.get("/memory", tags=["Admin"])
+def memory_report():
+    """Estimated bytes per tracked component of this worker, its budgets and recent evictions"""
+    return memory.memory_registry.report()
+
+@router.post("/memory/enforce", tags=["Admin"])
+def enforce_memory_budgets():
+    """Evict now until the memory budgets are respected"""
+    return {"evictions": memory.memory_registry.enforce()}
+
+@router.post("/memory/tracemalloc/start", tags=["Admin"])
+def start_tracemalloc(frames: int = Query(1, ge=1, le=50)):
+    """Start allocation tracing in this worker (slows allocations until stopped)"""
+    return memory.start_tracing(frames)
+
+@router.get("/memory/tracemalloc/snapshot", tags=["Admin"])
+def tracemalloc_snapshot(
+    limit: int = Query(20, ge=1, le=500),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    compare: bool = Query(False, description="Growth since the previous snapshot instead of totals")
+):
+    """Top allocation sites of this worker"""
+    try:
+        return memory.take_snapshot(limit, group_by, compare)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.post("/memory/tracemalloc/stop", tags=["Admin"])
+def stop_tracemalloc():
+    return memory.stop_tracing()
+
+@router.get("/intent/metrics", tags=["Admin"])
+def intent_metrics():
+    """Tokens generated, latency and parse failures of LLM intent extraction in this worker"""
+    response_generator = components.get("response_generator")
+    if response_generator is None:
+        raise HTTPException(status_code=503, detail="Chatbot sedang dipersiapkan")
+    return dict(
+        response_generator.intent_metrics.report(),
+        model=response_generator.intent_model,
+        output_mode=settings.INTENT_OUTPUT_MODE,
+        num_predict=settings.INTENT_NUM_PREDICT
+    )
+
+@router.get("/query-cache", tags=["Admin"])
+def query_cache_stats():
+    """Hit rate and size of the query embedding cache in this worker"""
+    cache = get_query_cache()
+    if cache is None:
+        raise HTTPException(status_code=404, detail="Cache embedding query tidak aktif")
+    return dict(cache.stats(), normalization=settings.QUERY_NORMALIZATION, stemming=settings.QUERY_STEMMING)
+
+@router.get("/rerank/metrics", tags=["Admin"])
+def rerank_metrics():
+    """Reranks run, skipped by the latency guard and score cache hit rate in this worker"""
+    response_generator = components.get("response_generator")
+    if response_generator is None:
+        raise HTTPException(status_code=503, detail="Chatbot sedang dipersiapkan")
+    reranker = response_generator.retriever.reranker
+    if reranker is None:
+        raise HTTPException(status_code=404, detail="Reranking tidak aktif")
+    return dict(reranker.metrics(), model=settings.RERANK_MODEL, budget_ms=settings.RERANK_BUDGET_MS)
@@ -1,6 +1,10 @@
-from fastapi import Depends, HTTPException, status
+import secrets
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.models import database_models as models
 
@@ -32,4 +36,17 @@ def get_pesanan_or_404(pesanan_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Pesanan dengan ID {pesanan_id} tidak ditemukan"
         )
-    return pesanan
\ No newline at end of file
+    return pesanan
+
+# Dependency guarding the admin endpoints with the X-Admin-Token header
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin API dinonaktifkan (ADMIN_TOKEN belum diatur)"
+        )
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token admin tidak valid"
+        )
\ No newline at end of file
@@ -1,18 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import hashlib
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.core.database import get_db
 from app.models import database_models as models
+from app.models.order_summary import get_summaries
 from app.api import dependencies as deps
+from app.api.responses import FastJSONResponse
 
 router = APIRouter()
 
+PRODUK_FIELDS = ("id", "nama", "deskripsi", "kategori", "harga", "stok", "gambar_url", "created_at", "updated_at")
+PESANAN_FIELDS = ("id", "pelanggan_id", "tanggal_pesanan", "status", "total_harga", "alamat_pengiriman", "catatan")
+FAQ_FIELDS = ("id", "pertanyaan", "jawaban", "kategori", "aktif", "created_at", "updated_at")
+
+# Upper bound on ids accepted by the bulk endpoints
+MAX_BULK_IDS = 500
+
+def _parse_fields(fields: Optional[str], allowed: tuple) -> List[str]:
+    """Validate a comma-separated projection; the id column is always included"""
+    if not fields:
+        return list(allowed)
+    
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Field tidak dikenal: {', '.join(unknown)}. Field yang tersedia: {', '.join(allowed)}"
+        )
+    
+    return ["id"] + [field for field in dict.fromkeys(requested) if field != "id"]
+
+def _parse_ids(ids: List[str]) -> List[int]:
+    """Parse ids given as ?ids=1,2,3 and/or repeated ?ids= parameters"""
+    try:
+        parsed = [int(part) for value in ids for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Parameter ids harus berupa daftar angka dipisah koma")
+    
+    parsed = list(dict.fromkeys(parsed))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="Parameter ids tidak boleh kosong")
+    if len(parsed) > MAX_BULK_IDS:
+        raise HTTPException(status_code=400, detail=f"Maksimal {MAX_BULK_IDS} ids per permintaan")
+    return parsed
+
+def _project(db: Session, model, field_names: List[str]):
+    """Query only the requested columns so long text columns are not loaded unless asked for"""
+    return db.query(*[getattr(model, field) for field in field_names])
+
+def _collection_etag(request: Request, query, model) -> str:
+    """Weak ETag derived from the newest updated_at and row count of the filtered rows"""
+    latest, count = query.with_entities(func.max(model.updated_at), func.count(model.id)).one()
+    fingerprint = f"{latest}|{count}|{request.url.path}?{request.url.query}"
+    return f'W/"{hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()}"'
+
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Return a 304 response when the client's cached copy is still current"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+def _keyset_page(request: Request, model, query, fields: Optional[str], allowed: tuple,
+                 cursor: Optional[int], skip: int, limit: int) -> Response:
+    """Serve one page of a catalogue listing with projection, keyset pagination and ETags"""
+    field_names = _parse_fields(fields, allowed)
+    
+    etag = _collection_etag(request, query, model)
+    cached = _not_modified(request, etag)
+    if cached:
+        return cached
+    
+    page = query.with_entities(*[getattr(model, field) for field in field_names]).order_by(model.id)
+    if cursor is not None:
+        # Keyset pagination: seek past the last id of the previous page via the primary key index
+        page = page.filter(model.id > cursor)
+    elif skip:
+        page = page.offset(skip)
+    
+    rows = [row._asdict() for row in page.limit(limit).all()]
+    
+    headers = {"ETag": etag}
+    if len(rows) == limit:
+        headers["X-Next-Cursor"] = str(rows[-1]["id"])
+    
+    return FastJSONResponse(content=rows, headers=headers)
+
 @router.get("/produk", tags=["Produk"])
 def get_produk_list(
-    skip: int = 0, 
-    limit: int = 100, 
+    request: Request,
+    skip: int = Query(0, ge=0, description="Offset (lebih lambat untuk halaman jauh, gunakan cursor)"),
+    limit: int = Query(100, ge=1, le=1000),
     kategori: Optional[str] = None,
+    cursor: Optional[int] = Query(None, description="ID terakhir dari halaman sebelumnya (header X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Daftar kolom dipisah koma, misalnya id,nama,harga"),
     db: Session = Depends(get_db)
 ):
     """Mengambil daftar produk dengan opsi filter berdasarkan kategori"""
@@ -21,7 +106,50 @@ def get_produk_list(
     if kategori:
         query = query.filter(models.Produk.kategori == kategori)
     
-    return query.offset(skip).limit(limit).all()
+    return _keyset_page(request, models.Produk, query, fields, PRODUK_FIELDS, cursor, skip, limit)
+
+@router.get("/produk/bulk", tags=["Produk"])
+def get_produk_bulk(
+    request: Request,
+    ids: List[str] = Query(..., description="Daftar ID produk dipisah koma, misalnya 1,2,3"),
+    fields: Optional[str] = Query(None, description="Daftar kolom dipisah koma, misalnya id,nama,harga"),
+    db: Session = Depends(get_db)
+):
+    """Mengambil beberapa produk sekaligus berdasarkan daftar ID"""
+    produk_ids = _parse_ids(ids)
+    field_names = _parse_fields(fields, PRODUK_FIELDS)
+    
+    query = db.query(models.Produk).filter(models.Produk.id.in_(produk_ids))
+    etag = _collection_etag(request, query, models.Produk)
+    cached = _not_modified(request, etag)
+    if cached:
+        return cached
+    
+    found = {row.id: row._asdict() for row in _project(db, models.Produk, field_names).filter(models.Produk.id.in_(produk_ids))}
+    
+    return FastJSONResponse(
+        content={
+            "items": [found[produk_id] for produk_id in produk_ids if produk_id in found],
+            "missing": [produk_id for produk_id in produk_ids if produk_id not in found]
+        },
+        headers={"ETag": etag}
+    )
+
+@router.get("/produk/stok", tags=["Produk"])
+def get_produk_stok_bulk(
+    ids: List[str] = Query(..., description="Daftar ID produk dipisah koma, misalnya 1,2,3"),
+    db: Session = Depends(get_db)
+):
+    """Mengecek stok beberapa produk sekaligus, misalnya untuk seluruh isi keranjang"""
+    produk_ids = _parse_ids(ids)
+    
+    rows = _project(db, models.Produk, ["id", "nama", "stok"]).filter(models.Produk.id.in_(produk_ids))
+    found = {row.id: {"produk_id": row.id, "nama": row.nama, "stok": row.stok} for row in rows}
+    
+    return FastJSONResponse(content={
+        "items": [found[produk_id] for produk_id in produk_ids if produk_id in found],
+        "missing": [produk_id for produk_id in produk_ids if produk_id not in found]
+    })
 
 @router.get("/produk/{produk_id}", tags=["Produk"])
 def get_produk_detail(produk_id: int, db: Session = Depends(get_db)):
@@ -51,27 +179,52 @@ def get_pesanan_detail(pesanan_id: int, db: Session = Depends(get_db)):
 def get_pelanggan_pesanan(
     pelanggan_id: int, 
     status: Optional[str] = None,
+    detail: bool = Query(False, description="Daftar pesanan lengkap per halaman, bukan ringkasan"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[int] = Query(None, description="ID terakhir dari halaman sebelumnya (header X-Next-Cursor)"),
     db: Session = Depends(get_db)
 ):
-    """Mengambil daftar pesanan milik pelanggan"""
+    """Mengambil ringkasan pesanan pelanggan, atau daftar pesanannya per halaman dengan detail=true"""
     # Check if customer exists
-    pelanggan = db.query(models.Pelanggan).filter(models.Pelanggan.id == pelanggan_id).first()
+    pelanggan = db.query(models.Pelanggan.id).filter(models.Pelanggan.id == pelanggan_id).first()
     if not pelanggan:
         raise HTTPException(status_code=404, detail="Pelanggan tidak ditemukan")
     
-    # Query orders
-    query = db.query(models.Pesanan).filter(models.Pesanan.pelanggan_id == pelanggan_id)
+    if not detail and not status:
+        summary = get_summaries(db.connection(), [pelanggan_id]).get(pelanggan_id)
+        return FastJSONResponse(content=summary or {
+            "pelanggan_id": pelanggan_id,
+            "jumlah_pesanan": 0,
+            "jumlah_per_status": {},
+            "total_belanja": 0.0,
+            "pesanan_terakhir": [],
+            "pesanan_terakhir_pada": None,
+        })
+    
+    # Newest first; keyset pagination over the (pelanggan_id, id) index
+    query = _project(db, models.Pesanan, list(PESANAN_FIELDS)).filter(models.Pesanan.pelanggan_id == pelanggan_id)
     
     if status:
         query = query.filter(models.Pesanan.status == status)
+    if cursor is not None:
+        query = query.filter(models.Pesanan.id < cursor)
+    
+    rows = [row._asdict() for row in query.order_by(models.Pesanan.id.desc()).limit(limit).all()]
+    
+    headers = {}
+    if len(rows) == limit:
+        headers["X-Next-Cursor"] = str(rows[-1]["id"])
     
-    return query.all()
+    return FastJSONResponse(content=rows, headers=headers)
 
 @router.get("/faq", tags=["FAQ"])
 def get_faq_list(
-    skip: int = 0, 
-    limit: int = 100, 
+    request: Request,
+    skip: int = Query(0, ge=0, description="Offset (lebih lambat untuk halaman jauh, gunakan cursor)"),
+    limit: int = Query(100, ge=1, le=1000),
     kategori: Optional[str] = None,
+    cursor: Optional[int] = Query(None, description="ID terakhir dari halaman sebelumnya (header X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Daftar kolom dipisah koma, misalnya id,pertanyaan"),
     db: Session = Depends(get_db)
 ):
     """Mengambil daftar FAQ dengan opsi filter berdasarkan kategori"""
@@ -80,4 +233,4 @@ def get_faq_list(
     if kategori:
         query = query.filter(models.FAQ.kategori == kategori)
     
-    return query.offset(skip).limit(limit).all()
\ No newline at end of file
+    return _keyset_page(request, models.FAQ, query, fields, FAQ_FIELDS, cursor, skip, limit)
\ No newline at end of file
@@ -10,7 +10,15 @@ class Settings(BaseSettings):
     # API Settings
     API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
     API_PORT: int = int(os.getenv("API_PORT", "8000"))
-    
+    # Development auto-reload for `python main.py` (never use with multiple workers)
+    API_RELOAD: bool = os.getenv("API_RELOAD", "false").lower() == "true"
+    # Production (gunicorn preload) settings, see gunicorn.conf.py
+    API_WORKERS: int = int(os.getenv("API_WORKERS", "2"))
+    API_GRACEFUL_TIMEOUT: int = int(os.getenv("API_GRACEFUL_TIMEOUT", "30"))
+    API_MAX_REQUESTS: int = int(os.getenv("API_MAX_REQUESTS", "1000"))
+    # Delay between retries when a component (database, vector store) fails to initialize
+    STARTUP_RETRY_SECONDS: int = int(os.getenv("STARTUP_RETRY_SECONDS", "10"))
+
     # Database Settings
     DB_USER: str = os.getenv("DB_USER", "postgres")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "password")
@@ -23,10 +31,111 @@ class Settings(BaseSettings):
     OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
     OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "llama3")
     
+    # Intent Extraction Settings
+    # Smaller dedicated model for intent classification (defaults to OLLAMA_MODEL)
+    INTENT_MODEL: str = os.getenv("INTENT_MODEL", "")
+    # "schema" (JSON schema constrained), "json" (any JSON object) or "free" (unconstrained text)
+    INTENT_OUTPUT_MODE: str = os.getenv("INTENT_OUTPUT_MODE", "schema")
+    # Hard cap on tokens generated for one intent
+    INTENT_NUM_PREDICT: int = int(os.getenv("INTENT_NUM_PREDICT", "96"))
+    INTENT_TIMEOUT_SECONDS: int = int(os.getenv("INTENT_TIMEOUT_SECONDS", "30"))
+    
+    # Orders listed in a customer's order summary (newest first)
+    ORDER_SUMMARY_RECENT: int = int(os.getenv("ORDER_SUMMARY_RECENT", "5"))
+    
+    # Batch Chat Settings
+    # Concurrent Ollama generations and messages prepared (classified, embedded, looked up) per bulk step
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    BATCH_CHUNK_SIZE: int = int(os.getenv("BATCH_CHUNK_SIZE", "64"))
+    
     # Document and Vector Store Paths
     DOCUMENTS_PATH: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "documents")
     VECTOR_DB_PATH: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "vector_db")
-    
+    BATCH_OUTPUT_PATH: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "batch")
+    MIGRATIONS_PATH: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "migrations")
+    # Query embedding cache shared by all workers on the host
+    QUERY_CACHE_PATH: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "query_cache.sqlite3")
+    # Versioned vector stores built by background re-indexing, with the manifest of the active one
+    VECTOR_DB_VERSIONS_PATH: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "vector_db_versions")
+
+    # Embedding and Chunking Settings
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    # File types indexed from DOCUMENTS_PATH; .txt and .md (source type "txt") are opt-in, PDFs only by default
+    DOCUMENT_EXTENSIONS: str = os.getenv("DOCUMENT_EXTENSIONS", ".pdf")
+    # Chunk size and overlap in embedding-tokenizer tokens per source type; MiniLM truncates at 256
+    CHUNK_SIZES: str = os.getenv("CHUNK_SIZES", "pdf=240:40,txt=128:16,default=240:40")
+    # Chunks embedded and written to the vector store per batch
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+
+    # Near-duplicate chunk removal at ingest time (MinHash/LSH)
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_JACCARD_THRESHOLD: float = float(os.getenv("DEDUP_JACCARD_THRESHOLD", "0.8"))
+    DEDUP_NUM_PERM: int = int(os.getenv("DEDUP_NUM_PERM", "128"))
+    DEDUP_SHINGLE_WORDS: int = int(os.getenv("DEDUP_SHINGLE_WORDS", "3"))
+
+    # Vector Search Settings
+    # Mode is "exact" (float32 similarity search) or "binary" (Hamming prefilter + exact rescoring)
+    VECTOR_SEARCH_MODE: str = os.getenv("VECTOR_SEARCH_MODE", "exact")
+    # Per-collection overrides, e.g. "langchain=binary,produk=exact"
+    VECTOR_SEARCH_MODES: str = os.getenv("VECTOR_SEARCH_MODES", "")
+    # Candidates kept by the binary prefilter per requested result
+    BINARY_RESCORE_FACTOR: int = int(os.getenv("BINARY_RESCORE_FACTOR", "10"))
+
+    # Query Normalization and Embedding Cache
+    QUERY_NORMALIZATION: bool = os.getenv("QUERY_NORMALIZATION", "true").lower() == "true"
+    # Stem normalized queries with Sastrawi (optional dependency)
+    QUERY_STEMMING: bool = os.getenv("QUERY_STEMMING", "false").lower() == "true"
+    # Extra or overriding abbreviations, e.g. "cpt=cepat,bgt=banget"
+    QUERY_SLANG: str = os.getenv("QUERY_SLANG", "")
+    QUERY_CACHE_ENABLED: bool = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+    # Entries kept on disk (about 1.5 KB each for MiniLM) and in each worker's in-process LRU
+    QUERY_CACHE_MAX_ENTRIES: int = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "20000"))
+    QUERY_CACHE_MEMORY_ENTRIES: int = int(os.getenv("QUERY_CACHE_MEMORY_ENTRIES", "1024"))
+
+    # Cross-encoder Reranking (optional stage after vector search)
+    RERANK_ENABLED: bool = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    # Multilingual MS MARCO cross-encoder; scores are logits, so the margins below are in logit units
+    RERANK_MODEL: str = os.getenv("RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+    RERANK_MAX_LENGTH: int = int(os.getenv("RERANK_MAX_LENGTH", "256"))
+    RERANK_BATCH_SIZE: int = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+    # Candidates fetched from the vector store, and how many of them are always scored
+    RERANK_CANDIDATES: int = int(os.getenv("RERANK_CANDIDATES", "20"))
+    RERANK_MIN_CANDIDATES: int = int(os.getenv("RERANK_MIN_CANDIDATES", "8"))
+    # Score the remaining candidates when the weakest scored one is within this of the k-th best
+    RERANK_EXPAND_MARGIN: float = float(os.getenv("RERANK_EXPAND_MARGIN", "1.0"))
+    # Drop reranked chunks scoring more than this below the best chunk
+    RERANK_KEEP_MARGIN: float = float(os.getenv("RERANK_KEEP_MARGIN", "5.0"))
+    RERANK_CACHE_ENTRIES: int = int(os.getenv("RERANK_CACHE_ENTRIES", "50000"))
+    # Skip reranking while the median rerank latency exceeds this, or this many reranks are running
+    RERANK_BUDGET_MS: int = int(os.getenv("RERANK_BUDGET_MS", "250"))
+    RERANK_MAX_CONCURRENT: int = int(os.getenv("RERANK_MAX_CONCURRENT", "2"))
+
+    # Admin API (re-indexing); disabled while ADMIN_TOKEN is empty
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+
+    # Background Re-index Settings
+    # Versions kept on disk (the active one and its predecessors, for rollback)
+    REINDEX_KEEP_VERSIONS: int = int(os.getenv("REINDEX_KEEP_VERSIONS", "3"))
+    # Queries that must each return results from a new version before it is activated, separated by "|"
+    REINDEX_SMOKE_QUERIES: str = os.getenv(
+        "REINDEX_SMOKE_QUERIES",
+        "produk Rumah Kreatif Toba|cara memesan produk|pengiriman|kain tenun ulos"
+    )
+    # A new version must hold at least this fraction of the live version's chunks
+    REINDEX_MIN_CHUNK_RATIO: float = float(os.getenv("REINDEX_MIN_CHUNK_RATIO", "0.5"))
+    # How often each worker checks whether another worker activated a different version
+    REINDEX_POLL_SECONDS: int = int(os.getenv("REINDEX_POLL_SECONDS", "5"))
+    # How often products changed in the database are synced into a new version (0 disables)
+    CATALOGUE_SYNC_SECONDS: int = int(os.getenv("CATALOGUE_SYNC_SECONDS", "300"))
+
+    # Memory Budgets
+    # Cap for all tracked in-process components together, in MB (0 = unlimited)
+    MEMORY_BUDGET_MB: int = int(os.getenv("MEMORY_BUDGET_MB", "0"))
+    # Per-component caps in MB, e.g. "binary_index=256"
+    MEMORY_BUDGETS: str = os.getenv("MEMORY_BUDGETS", "")
+    # How often budgets are enforced in the background
+    MEMORY_CHECK_SECONDS: int = int(os.getenv("MEMORY_CHECK_SECONDS", "30"))
+
     class Config:
         env_file = ".env"
 
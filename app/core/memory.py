@@ -0,0 +1,211 @@
+"""Memory accounting for in-process models, indexes and caches, with budgets and eviction.
+
+Components register a byte estimate and, if they can give memory back, an evict callback
+that shrinks them to a target size. Budgets come from MEMORY_BUDGETS (per component,
+"name=MB,...") and MEMORY_BUDGET_MB (all tracked components together). When a budget is
+exceeded, the component (or, for the global budget, the largest evictable components
+first) is asked to evict. Components without an evict callback are reported but never
+evicted. Estimates cover what the component holds, not allocator overhead, so keep the
+global budget below the container limit.
+"""
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """Parse "embedding_cache=64,rerank_cache=32" into {name: bytes}"""
+    budgets = {}
+    for entry in spec.split(","):
+        name, _, megabytes = entry.partition("=")
+        if name.strip() and megabytes.strip():
+            budgets[name.strip()] = int(float(megabytes) * MB)
+    return budgets
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Current resident set size of this process (Linux only)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def module_nbytes(module) -> int:
+    """Bytes held by the parameters and buffers of a torch module"""
+    try:
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    except Exception:
+        return 0
+
+
+@dataclass
+class MemoryComponent:
+    name: str
+    estimate: Callable[[], int]
+    # Shrink to at most the given number of bytes and return the bytes freed
+    evict: Optional[Callable[[int], int]] = None
+
+
+class MemoryRegistry:
+    """Tracks per-component memory estimates and enforces the configured budgets"""
+
+    def __init__(self, budget_bytes: int = 0, budgets: Optional[Dict[str, int]] = None):
+        self._lock = threading.Lock()
+        self._components: Dict[str, MemoryComponent] = {}
+        self.budget_bytes = budget_bytes
+        self.budgets = budgets or {}
+        self.evictions: List[Dict[str, Any]] = []
+
+    def register(self, name: str, estimate: Callable[[], int], evict: Optional[Callable[[int], int]] = None):
+        """Register (or replace) a component"""
+        with self._lock:
+            self._components[name] = MemoryComponent(name, estimate, evict)
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._components.pop(name, None)
+
+    def _estimates(self) -> Dict[str, int]:
+        with self._lock:
+            components = list(self._components.values())
+        estimates = {}
+        for component in components:
+            try:
+                estimates[component.name] = int(component.estimate())
+            except Exception as e:
+                logger.error(f"Error estimating memory of {component.name}: {str(e)}")
+                estimates[component.name] = 0
+        return estimates
+
+    def report(self) -> Dict[str, Any]:
+        estimates = self._estimates()
+        return {
+            "pid": os.getpid(),
+            "process_rss_bytes": process_rss_bytes(),
+            "tracked_bytes": sum(estimates.values()),
+            "budget_bytes": self.budget_bytes or None,
+            "components": {
+                name: {
+                    "bytes": size,
+                    "budget_bytes": self.budgets.get(name),
+                    "evictable": self._components[name].evict is not None if name in self._components else False,
+                }
+                for name, size in sorted(estimates.items(), key=lambda item: -item[1])
+            },
+            "recent_evictions": self.evictions[-20:],
+        }
+
+    def _evict(self, name: str, target: int, reason: str) -> int:
+        component = self._components.get(name)
+        if component is None or component.evict is None:
+            return 0
+        try:
+            freed = int(component.evict(max(target, 0)) or 0)
+        except Exception as e:
+            logger.error(f"Error evicting from {name}: {str(e)}")
+            return 0
+        if freed:
+            event = {"component": name, "freed_bytes": freed, "reason": reason, "at": time.time()}
+            self.evictions = (self.evictions + [event])[-100:]
+            logger.info(f"Evicted {freed} bytes from {name} ({reason})")
+        return freed
+
+    def enforce(self) -> List[Dict[str, Any]]:
+        """Evict until every per-component budget and the global budget are respected"""
+        before = len(self.evictions)
+        estimates = self._estimates()
+
+        for name, budget in self.budgets.items():
+            if estimates.get(name, 0) > budget:
+                estimates[name] -= self._evict(name, budget, "component budget")
+
+        if self.budget_bytes:
+            # Largest evictable components first, each shrunk just enough to fit
+            for name, size in sorted(estimates.items(), key=lambda item: -item[1]):
+                excess = sum(estimates.values()) - self.budget_bytes
+                if excess <= 0:
+                    break
+                estimates[name] -= self._evict(name, size - excess, "global budget")
+
+        return self.evictions[before:]
+
+    def _watch(self):
+        while True:
+            time.sleep(settings.MEMORY_CHECK_SECONDS)
+            self.enforce()
+
+    def start_watcher(self) -> Optional[threading.Thread]:
+        """Enforce budgets periodically in the background (only when any budget is set)"""
+        if not (self.budget_bytes or self.budgets) or not settings.MEMORY_CHECK_SECONDS:
+            return None
+        thread = threading.Thread(target=self._watch, name="memory-budget", daemon=True)
+        thread.start()
+        return thread
+
+
+memory_registry = MemoryRegistry(
+    budget_bytes=settings.MEMORY_BUDGET_MB * MB,
+    budgets=parse_budgets(settings.MEMORY_BUDGETS),
+)
+
+
+# On-demand allocation tracing (per process; tracing slows allocations while active)
+_previous_snapshot: Optional[tracemalloc.Snapshot] = None
+
+
+def start_tracing(frames: int = 1) -> Dict[str, Any]:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return tracing_status()
+
+
+def stop_tracing() -> Dict[str, Any]:
+    global _previous_snapshot
+    tracemalloc.stop()
+    _previous_snapshot = None
+    return tracing_status()
+
+
+def tracing_status() -> Dict[str, Any]:
+    status = {"pid": os.getpid(), "tracing": tracemalloc.is_tracing()}
+    if status["tracing"]:
+        current, peak = tracemalloc.get_traced_memory()
+        status.update({"traced_bytes": current, "peak_bytes": peak, "overhead_bytes": tracemalloc.get_tracemalloc_memory()})
+    return status
+
+
+def take_snapshot(limit: int = 20, group_by: str = "lineno", compare: bool = False) -> Dict[str, Any]:
+    """Top allocation sites, or the top growth since the previous snapshot when compare is set"""
+    global _previous_snapshot
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc belum aktif")
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    if compare and _previous_snapshot is not None:
+        stats = snapshot.compare_to(_previous_snapshot, group_by)
+        top = [{"where": str(stat.traceback), "size_bytes": stat.size, "size_diff_bytes": stat.size_diff,
+                "count": stat.count, "count_diff": stat.count_diff} for stat in stats[:limit]]
+    else:
+        stats = snapshot.statistics(group_by)
+        top = [{"where": str(stat.traceback), "size_bytes": stat.size, "count": stat.count} for stat in stats[:limit]]
+    _previous_snapshot = snapshot
+
+    return dict(tracing_status(), group_by=group_by, compared=compare, top=top)
@@ -0,0 +1,112 @@
+"""Apply the SQL files in migrations/ once each, in file name order.
+
+Applied files are recorded in the schema_migrations table. Statements run one by one in
+autocommit mode because CREATE INDEX CONCURRENTLY cannot run inside a transaction, so
+migrations must be idempotent (IF NOT EXISTS) and a migration interrupted halfway is run
+again from the start. An interrupted CREATE INDEX CONCURRENTLY leaves an INVALID index
+behind that IF NOT EXISTS would then skip forever, so before a migration runs, the
+indexes it creates that are marked invalid in pg_index are dropped (DROP INDEX
+CONCURRENTLY) and built again. A pg_advisory_lock keeps concurrently starting workers
+from applying the same migration twice, or from dropping an index another worker is
+still building.
+
+    python -m app.core.migrations
+"""
+import logging
+import os
+import re
+from typing import List
+
+from sqlalchemy import text
+
+from app.core.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_advisory_lock
+_ADVISORY_LOCK_KEY = 720311
+
+# Index name of a CREATE [UNIQUE] INDEX [CONCURRENTLY] [IF NOT EXISTS] statement
+_CREATE_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?\"?(\w+)\"?",
+    re.IGNORECASE
+)
+
+
+def split_statements(sql: str) -> List[str]:
+    """Split a migration file into statements, dropping -- comment lines"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+def created_indexes(statements: List[str]) -> List[str]:
+    """Names of the indexes created by a migration's statements"""
+    matches = (_CREATE_INDEX.match(statement) for statement in statements)
+    return [match.group(1) for match in matches if match]
+
+
+def drop_invalid_indexes(connection, names: List[str]) -> List[str]:
+    """Drop the given indexes where an interrupted concurrent build left them INVALID; returns those dropped"""
+    if not names:
+        return []
+    invalid = [row[0] for row in connection.execute(text(
+        "SELECT c.relname FROM pg_index i "
+        "JOIN pg_class c ON c.oid = i.indexrelid "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE NOT i.indisvalid AND n.nspname = current_schema() AND c.relname = ANY(:names)"
+    ), {"names": list(names)})]
+    for name in invalid:
+        logger.warning(f"Dropping invalid index {name} left by an interrupted migration")
+        connection.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {connection.dialect.identifier_preparer.quote(name)}")
+    return invalid
+
+
+def migration_files() -> List[str]:
+    if not os.path.isdir(settings.MIGRATIONS_PATH):
+        return []
+    return sorted(name for name in os.listdir(settings.MIGRATIONS_PATH) if name.endswith(".sql"))
+
+
+def apply_migrations(engine=None) -> List[str]:
+    """Apply pending migrations and return the names of the files applied"""
+    if engine is None:
+        from app.core.database import engine
+
+    if engine.dialect.name != "postgresql":
+        logger.info(f"Skipping SQL migrations on {engine.dialect.name}")
+        return []
+
+    applied_now = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+        try:
+            connection.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "version VARCHAR(255) PRIMARY KEY, applied_at TIMESTAMP NOT NULL DEFAULT now())"
+            ))
+            applied = {row[0] for row in connection.execute(text("SELECT version FROM schema_migrations"))}
+
+            for name in migration_files():
+                if name in applied:
+                    continue
+
+                with open(os.path.join(settings.MIGRATIONS_PATH, name), encoding="utf-8") as f:
+                    statements = split_statements(f.read())
+
+                drop_invalid_indexes(connection, created_indexes(statements))
+                logger.info(f"Applying migration {name} ({len(statements)} statements)")
+                for statement in statements:
+                    connection.exec_driver_sql(statement)
+                connection.execute(text("INSERT INTO schema_migrations (version) VALUES (:version)"), {"version": name})
+                applied_now.append(name)
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+
+    return applied_now
+
+
+if __name__ == "__main__":
+    applied = apply_migrations()
+    print(f"Applied: {', '.join(applied)}" if applied else "No pending migrations")
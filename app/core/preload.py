@@ -0,0 +1,63 @@
+import gc
+import logging
+
+from app.core.config import settings
+from app.core.startup import startup_profile
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _binary_collections():
+    """Collections configured for binary-quantized search, whose index is worth preloading"""
+    if settings.VECTOR_SEARCH_MODE == "binary":
+        return None  # every collection; resolved from the opened vector store
+    return [
+        name.strip()
+        for name, _, mode in (entry.partition("=") for entry in settings.VECTOR_SEARCH_MODES.split(","))
+        if mode.strip() == "binary"
+    ]
+
+
+def preload_shared_state():
+    """Load read-only model weights and indexes in the master process before workers fork.
+
+    Pages loaded here are shared copy-on-write by every forked worker. Only weights and
+    packed index arrays are loaded; no inference runs in the master, and the Chroma client
+    (sqlite connection, HNSW segment) is closed again because it is not fork-safe, so each
+    worker opens its own client during its background initialization.
+    """
+    try:
+        with startup_profile.timed("preload:embedding_model"):
+            from app.rag.embedder import DocumentEmbedder, get_embeddings
+            get_embeddings()
+
+        if settings.RERANK_ENABLED:
+            with startup_profile.timed("preload:rerank_model"):
+                from app.rag.reranker import get_cross_encoder
+                get_cross_encoder()
+
+        collections = _binary_collections()
+        if collections is None or collections:
+            with startup_profile.timed("preload:binary_index"):
+                from app.rag.quantization import BinaryQuantizedIndex, set_shared_index
+
+                vector_db = DocumentEmbedder().load_vector_db()
+                if vector_db is not None:
+                    name = vector_db._collection.name
+                    if collections is None or name in collections:
+                        set_shared_index(name, BinaryQuantizedIndex.from_vector_db(vector_db))
+                    del vector_db
+
+                from chromadb.api.shared_system_client import SharedSystemClient
+                SharedSystemClient.clear_system_cache()
+    except Exception as e:
+        # Workers fall back to loading everything themselves
+        logger.error(f"Error preloading shared state: {str(e)}")
+
+    # Move everything allocated so far out of the collector's reach so that garbage
+    # collection in the workers does not touch (and un-share) these pages
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Preloaded shared state: {startup_profile.report()['timings_ms']}")
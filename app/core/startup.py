@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Process start reference for time-to-listen and time-to-ready measurements
+_PROCESS_START = time.perf_counter()
+
+
+class StartupProfile:
+    """Records import and initialization time per component"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings: Dict[str, float] = {}
+        self.milestones: Dict[str, float] = {}
+
+    @contextmanager
+    def timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    def mark(self, milestone: str):
+        """Record the time since process start at which a milestone was reached"""
+        with self._lock:
+            self.milestones[milestone] = round((time.perf_counter() - _PROCESS_START) * 1000, 1)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "timings_ms": dict(self.timings),
+                "milestones_ms": dict(self.milestones),
+            }
+
+
+class ComponentRegistry:
+    """Holds lazily initialized subsystems and their readiness state"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._states: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            self._factories[name] = factory
+            self._states[name] = {"status": "pending", "error": None}
+
+    def get(self, name: str) -> Optional[Any]:
+        """Return the instance if it has finished initializing, otherwise None"""
+        return self._instances.get(name)
+
+    def set(self, name: str, instance: Any):
+        """Replace a ready instance, e.g. after a re-index"""
+        with self._lock:
+            self._instances[name] = instance
+            self._states[name] = {"status": "ready", "error": None}
+
+    def initialize(self, name: str) -> bool:
+        """Run a component's factory once; returns True when the component is ready"""
+        if self._states.get(name, {}).get("status") == "ready":
+            return True
+
+        with self._lock:
+            self._states[name] = {"status": "initializing", "error": None}
+
+        try:
+            with startup_profile.timed(f"init:{name}"):
+                instance = self._factories[name]()
+        except Exception as e:
+            logger.error(f"Error initializing {name}: {str(e)}")
+            with self._lock:
+                self._states[name] = {"status": "failed", "error": str(e)}
+            return False
+
+        self.set(name, instance)
+        logger.info(f"Component {name} ready")
+        return True
+
+    def pending(self) -> List[str]:
+        return [name for name, state in self._states.items() if state["status"] != "ready"]
+
+    def is_ready(self) -> bool:
+        return not self.pending()
+
+    def states(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(state) for name, state in self._states.items()}
+
+
+startup_profile = StartupProfile()
+components = ComponentRegistry()
+
+
+def _initialize_database():
+    from app.core.database import Base, engine
+    from app.core.migrations import apply_migrations
+    from app.models import database_models  # noqa: F401  (registers tables on Base)
+
+    Base.metadata.create_all(bind=engine)
+    # Indexes and changes to tables that create_all does not alter once they exist
+    applied = apply_migrations(engine)
+    if "0002_ringkasan_pesanan.sql" in applied:
+        from app.models.order_summary import backfill_summaries
+        backfill_summaries(engine)
+    return engine
+
+
+def _initialize_response_generator():
+    with startup_profile.timed("import:app.rag.generator"):
+        from app.rag.generator import ResponseGenerator
+
+    return ResponseGenerator()
+
+
+components.register("database", _initialize_database)
+components.register("response_generator", _initialize_response_generator)
+
+
+def initialize_components():
+    """Initialize every registered component, retrying failures until all are ready"""
+    while True:
+        for name in components.pending():
+            components.initialize(name)
+
+        if components.is_ready():
+            startup_profile.mark("ready")
+            logger.info(f"All components ready: {startup_profile.report()}")
+            return
+
+        logger.warning(f"Components not ready ({', '.join(components.pending())}), retrying in {settings.STARTUP_RETRY_SECONDS}s")
+        time.sleep(settings.STARTUP_RETRY_SECONDS)
+
+
+def start_background_initialization() -> threading.Thread:
+    """Initialize heavy subsystems off the import path so the server can listen immediately"""
+    thread = threading.Thread(target=initialize_components, name="component-init", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1 @@
+from app.models import order_summary  # noqa: F401  (registers the order summary refresh listeners)
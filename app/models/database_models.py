@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Boolean, Index, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -17,6 +17,14 @@ class Produk(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Indexes (kept in sync with migrations/)
+    __table_args__ = (
+        # Kategori filter with keyset pagination by id
+        Index("ix_produk_kategori_id", kategori, id),
+        # max(updated_at) for catalogue ETags and product re-index sync
+        Index("ix_produk_updated_at", updated_at),
+    )
+    
     # Relationship
     pesanan_items = relationship("PesananItem", back_populates="produk")
 
@@ -44,6 +52,14 @@ class Pesanan(Base):
     alamat_pengiriman = Column(Text, nullable=True)
     catatan = Column(Text, nullable=True)
     
+    # Indexes (kept in sync with migrations/)
+    __table_args__ = (
+        # Orders of a customer, optionally by status
+        Index("ix_pesanan_pelanggan_id_status", pelanggan_id, status),
+        # Newest orders of a customer first, and keyset pagination of them
+        Index("ix_pesanan_pelanggan_id_id", pelanggan_id, id),
+    )
+    
     # Relationships
     pelanggan = relationship("Pelanggan", back_populates="pesanan")
     pesanan_items = relationship("PesananItem", back_populates="pesanan")
@@ -58,6 +74,12 @@ class PesananItem(Base):
     harga_satuan = Column(Float, nullable=False)
     subtotal = Column(Float, nullable=False)
     
+    # Indexes (kept in sync with migrations/)
+    __table_args__ = (
+        # Items of an order
+        Index("ix_pesanan_item_pesanan_id", pesanan_id),
+    )
+    
     # Relationships
     pesanan = relationship("Pesanan", back_populates="pesanan_items")
     produk = relationship("Produk", back_populates="pesanan_items")
@@ -71,4 +93,25 @@ class FAQ(Base):
     kategori = Column(String(100), nullable=True)
     aktif = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Indexes (kept in sync with migrations/)
+    __table_args__ = (
+        # Active FAQs by kategori; inactive rows are left out of the index
+        Index("ix_faq_kategori_id_aktif", kategori, id, postgresql_where=(aktif == True)),
+    )
+
+class RingkasanPesanan(Base):
+    """Per-customer order summary, refreshed whenever the customer's orders change (app/models/order_summary.py)"""
+    __tablename__ = "ringkasan_pesanan"
+    
+    pelanggan_id = Column(Integer, ForeignKey("pelanggan.id"), primary_key=True)
+    jumlah_pesanan = Column(Integer, nullable=False, default=0)
+    # {"pending": 2, "selesai": 40, ...}
+    jumlah_per_status = Column(JSON, nullable=False, default=dict)
+    # Sum of total_harga over all orders except cancelled ones
+    total_belanja = Column(Float, nullable=False, default=0.0)
+    # The newest ORDER_SUMMARY_RECENT orders: [{"id", "tanggal_pesanan", "status", "total_harga"}, ...]
+    pesanan_terakhir = Column(JSON, nullable=False, default=list)
+    pesanan_terakhir_pada = Column(DateTime, nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""Maintenance of the per-customer order summary table (ringkasan_pesanan).
+
+Every flush that inserts, updates or deletes a Pesanan recomputes the summaries of the
+customers involved, inside the same transaction, from their own orders only. Concurrent
+refreshes of one customer are serialized with a row lock on the pelanggan row (FOR NO
+KEY UPDATE, which does not block inserting orders that reference it), so the last
+refresh always sees every committed order.
+
+Writes that bypass the ORM unit of work (bulk Query.update/delete, raw SQL, COPY) do not
+refresh summaries; run the backfill afterwards:
+
+    python -m app.models.order_summary
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable
+
+from sqlalchemy import delete, event, func, inspect, insert, select
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models import database_models as models
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Orders with this status are counted but not added to total_belanja
+CANCELLED_STATUS = "dibatalkan"
+
+_PENDING_KEY = "ringkasan_pesanan_pelanggan_ids"
+
+_pesanan = models.Pesanan.__table__
+_ringkasan = models.RingkasanPesanan.__table__
+_pelanggan = models.Pelanggan.__table__
+
+
+def summarize(connection, condition) -> Dict[int, Dict[str, Any]]:
+    """Compute summary rows for the customers whose orders match a condition on pesanan"""
+    summaries: Dict[int, Dict[str, Any]] = {}
+
+    by_status = connection.execute(
+        select(_pesanan.c.pelanggan_id, _pesanan.c.status, func.count(), func.sum(_pesanan.c.total_harga),
+               func.max(_pesanan.c.tanggal_pesanan))
+        .where(condition)
+        .group_by(_pesanan.c.pelanggan_id, _pesanan.c.status)
+    )
+    for pelanggan_id, status, count, total, latest in by_status:
+        summary = summaries.setdefault(pelanggan_id, {
+            "pelanggan_id": pelanggan_id,
+            "jumlah_pesanan": 0,
+            "jumlah_per_status": {},
+            "total_belanja": 0.0,
+            "pesanan_terakhir": [],
+            "pesanan_terakhir_pada": None,
+        })
+        status = status or "pending"
+        summary["jumlah_pesanan"] += count
+        summary["jumlah_per_status"][status] = summary["jumlah_per_status"].get(status, 0) + count
+        if status != CANCELLED_STATUS:
+            summary["total_belanja"] += total or 0.0
+        if latest is not None and (summary["pesanan_terakhir_pada"] is None or latest > summary["pesanan_terakhir_pada"]):
+            summary["pesanan_terakhir_pada"] = latest
+
+    # Newest orders per customer in one query, served by the (pelanggan_id, id) index
+    ranked = select(
+        _pesanan.c.id, _pesanan.c.pelanggan_id, _pesanan.c.tanggal_pesanan, _pesanan.c.status, _pesanan.c.total_harga,
+        func.row_number().over(partition_by=_pesanan.c.pelanggan_id, order_by=_pesanan.c.id.desc()).label("urutan")
+    ).where(condition).subquery()
+    recent = connection.execute(
+        select(ranked)
+        .where(ranked.c.urutan <= settings.ORDER_SUMMARY_RECENT)
+        .order_by(ranked.c.pelanggan_id, ranked.c.urutan)
+    )
+    for row in recent:
+        summaries[row.pelanggan_id]["pesanan_terakhir"].append({
+            "id": row.id,
+            "tanggal_pesanan": row.tanggal_pesanan.isoformat() if row.tanggal_pesanan else None,
+            "status": row.status,
+            "total_harga": row.total_harga,
+        })
+
+    return summaries
+
+
+def _replace(connection, pesanan_condition, ringkasan_condition, pelanggan_condition) -> int:
+    """Recompute and rewrite the summaries of a set of customers"""
+    # Serialize with other refreshes of the same customers (no-op on SQLite)
+    connection.execute(
+        select(_pelanggan.c.id).where(pelanggan_condition).order_by(_pelanggan.c.id).with_for_update(key_share=True)
+    ).all()
+
+    summaries = summarize(connection, pesanan_condition)
+    connection.execute(delete(_ringkasan).where(ringkasan_condition))
+    if summaries:
+        now = datetime.utcnow()
+        connection.execute(insert(_ringkasan), [dict(summary, updated_at=now) for summary in summaries.values()])
+    return len(summaries)
+
+
+def refresh_summaries(connection, pelanggan_ids: Iterable[int]) -> int:
+    """Recompute the summaries of the given customers; customers without orders get no row"""
+    ids = sorted(set(pelanggan_ids))
+    if not ids:
+        return 0
+    return _replace(
+        connection,
+        _pesanan.c.pelanggan_id.in_(ids),
+        _ringkasan.c.pelanggan_id.in_(ids),
+        _pelanggan.c.id.in_(ids),
+    )
+
+
+def backfill_summaries(engine=None, batch_size: int = 5000) -> int:
+    """Rebuild every summary, one transaction per range of customer ids"""
+    if engine is None:
+        from app.core.database import engine
+
+    with engine.connect() as connection:
+        low, high = connection.execute(select(func.min(_pelanggan.c.id), func.max(_pelanggan.c.id))).one()
+    if low is None:
+        return 0
+
+    total = 0
+    for start in range(low, high + 1, batch_size):
+        end = start + batch_size - 1
+        with engine.begin() as connection:
+            total += _replace(
+                connection,
+                _pesanan.c.pelanggan_id.between(start, end),
+                _ringkasan.c.pelanggan_id.between(start, end),
+                _pelanggan.c.id.between(start, end),
+            )
+    logger.info(f"Backfilled order summaries for {total} customers")
+    return total
+
+
+def get_summaries(connection, pelanggan_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Stored summaries of the given customers, computed live for any without a row yet"""
+    ids = sorted(set(pelanggan_ids))
+    if not ids:
+        return {}
+
+    rows = connection.execute(select(_ringkasan).where(_ringkasan.c.pelanggan_id.in_(ids))).mappings()
+    summaries = {row["pelanggan_id"]: {key: value for key, value in row.items() if key != "updated_at"} for row in rows}
+
+    # Not backfilled yet (or written outside the ORM); customers without orders stay absent
+    missing = [pelanggan_id for pelanggan_id in ids if pelanggan_id not in summaries]
+    if missing:
+        summaries.update(summarize(connection, _pesanan.c.pelanggan_id.in_(missing)))
+
+    for summary in summaries.values():
+        if summary["pesanan_terakhir_pada"] is not None:
+            summary["pesanan_terakhir_pada"] = summary["pesanan_terakhir_pada"].isoformat()
+    return summaries
+
+
+def _track(target, *pelanggan_ids):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).update(i for i in pelanggan_ids if i is not None)
+
+
+@event.listens_for(models.Pesanan, "after_insert")
+def _pesanan_inserted(mapper, connection, target):
+    _track(target, target.pelanggan_id)
+
+
+@event.listens_for(models.Pesanan, "after_update")
+def _pesanan_updated(mapper, connection, target):
+    # An order moved to another customer changes both summaries
+    _track(target, target.pelanggan_id, *inspect(target).attrs.pelanggan_id.history.deleted)
+
+
+@event.listens_for(models.Pesanan, "after_delete")
+def _pesanan_deleted(mapper, connection, target):
+    _track(target, target.pelanggan_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_after_flush(session, flush_context):
+    pelanggan_ids = session.info.pop(_PENDING_KEY, None)
+    if pelanggan_ids:
+        refresh_summaries(session.connection(), pelanggan_ids)
+
+
+if __name__ == "__main__":
+    print(f"Backfilled {backfill_summaries()} customer order summaries")
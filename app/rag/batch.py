@@ -0,0 +1,191 @@
+"""Batch chat processing for replaying message backlogs (JSONL in, JSONL out).
+
+Each input line is a JSON object {"id": ..., "message": ..., "user_id": ...}; lines
+without an id are identified by their line number. Results are written as soon as
+each message finishes, and a run pointed at an existing output file skips the ids
+already answered there, so an interrupted run can simply be restarted. Failed messages
+(including Ollama being unreachable) are written as {"id": ..., "error": ...} and are
+retried by the next run, which appends their new result; the last line per id wins.
+
+    python -m app.rag.batch --input backlog.jsonl --output results.jsonl
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Set
+
+from app.core.config import settings
+from app.rag.catalogue import metadata_filter
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def read_messages(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Parse JSONL lines into message dicts with a stable id"""
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            yield {"id": f"line-{line_number}", "error": "invalid JSON"}
+            continue
+        if not isinstance(message, dict):
+            message = {"message": str(message)}
+        message["id"] = str(message.get("id") or f"line-{line_number}")
+        yield message
+
+
+def read_completed_ids(output_path: str) -> Set[str]:
+    """Ids answered successfully by a previous (possibly interrupted) run; failed ids are redone"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+                if "response" in result and not result.get("error"):
+                    completed.add(str(result["id"]))
+            except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+                continue  # a partially written last line is simply redone
+    return completed
+
+
+class BatchProcessor:
+    """Runs many messages through the RAG pipeline with bulk retrieval and bounded generation"""
+
+    def __init__(self, generator, concurrency: int = None, chunk_size: int = None):
+        self.generator = generator
+        self.retriever = generator.retriever
+        self.concurrency = concurrency or settings.BATCH_CONCURRENCY
+        self.chunk_size = chunk_size or settings.BATCH_CHUNK_SIZE
+
+    def _prepare_chunk(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Classify, embed and look up context for a chunk of messages in bulk"""
+        queries = [message["message"] for message in messages]
+        intents = self.generator._classify_bulk(queries)
+        doc_chunks = self.retriever.retrieve_documents_batch(queries, wheres=[metadata_filter(data) for data in intents])
+
+        def ids_for(intent_names, entity):
+            return [int(data["entities"][entity]) for data in intents
+                    if data["intent"] in intent_names and data["entities"].get(entity)]
+
+        # One IN (...) query per table for the whole chunk
+        products = self.retriever.retrieve_products_bulk(ids_for(("produk_info", "stok_check"), "produk_id"))
+        orders = self.retriever.retrieve_orders_bulk(ids_for(("order_status",), "pesanan_id"))
+        customer_orders = self.retriever.retrieve_customer_orders_bulk(ids_for(("customer_orders",), "pelanggan_id"))
+        faqs = self.retriever.retrieve_faq() if any(data["intent"] == "faq" for data in intents) else []
+
+        prepared = []
+        for message, intent_data, chunks in zip(messages, intents, doc_chunks):
+            entities = intent_data["entities"]
+            lookups = {
+                "product_info": products.get(entities.get("produk_id")),
+                "order_info": orders.get(entities.get("pesanan_id")),
+                "orders": customer_orders.get(entities.get("pelanggan_id")),
+                "faqs": faqs if intent_data["intent"] == "faq" else None,
+            }
+            prepared.append({
+                "message": message,
+                "intent": intent_data["intent"],
+                "context": self.generator._format_context(intent_data, lookups, chunks),
+            })
+        return prepared
+
+    def _generate(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        message = item["message"]
+        try:
+            response = self.generator._call_ollama_api(
+                self.generator._build_prompt(message["message"]),
+                context=item["context"],
+                raise_errors=True
+            )
+        except Exception as e:
+            logger.error(f"Error generating batch response for {message['id']}: {str(e)}")
+            return {"id": message["id"], "user_id": message.get("user_id"), "error": str(e)}
+        return {
+            "id": message["id"],
+            "user_id": message.get("user_id"),
+            "intent": item["intent"],
+            "response": response,
+        }
+
+    def process(self, messages: Iterable[Dict[str, Any]], skip_ids: Set[str] = frozenset()) -> Iterator[Dict[str, Any]]:
+        """Yield one result per message, in completion order"""
+        messages = iter(messages)
+        max_pending = self.concurrency * 2
+        pending: Set[Future] = set()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch-generate") as executor:
+            while True:
+                chunk = list(islice(messages, self.chunk_size))
+                if not chunk:
+                    break
+
+                valid = []
+                for message in chunk:
+                    if message["id"] in skip_ids:
+                        continue
+                    if message.get("error") or not message.get("message"):
+                        yield {"id": message["id"], "error": message.get("error") or "missing message"}
+                        continue
+                    valid.append(message)
+
+                for item in self._prepare_chunk(valid) if valid else []:
+                    # Bounded queue: wait for a slot before submitting more generations
+                    while len(pending) >= max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield future.result()
+                    pending.add(executor.submit(self._generate, item))
+
+                done = {future for future in pending if future.done()}
+                pending -= done
+                for future in done:
+                    yield future.result()
+
+            for future in as_completed(pending):
+                yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", required=True, help="JSONL file, or - for stdin")
+    parser.add_argument("--output", required=True, help="JSONL file (appended and resumable), or - for stdout")
+    parser.add_argument("--concurrency", type=int, default=settings.BATCH_CONCURRENCY)
+    args = parser.parse_args()
+
+    from app.rag.generator import ResponseGenerator
+
+    processor = BatchProcessor(ResponseGenerator(), concurrency=args.concurrency)
+    skip_ids = read_completed_ids(args.output) if args.output != "-" else set()
+    if skip_ids:
+        logger.info(f"Resuming: skipping {len(skip_ids)} messages already answered in {args.output}")
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "a", encoding="utf-8")
+    try:
+        count = 0
+        for result in processor.process(read_messages(source), skip_ids):
+            sink.write(json.dumps(result, ensure_ascii=False) + "\n")
+            sink.flush()
+            count += 1
+        logger.info(f"Processed {count} messages")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Product catalogue documents in the vector store and intent-derived metadata filters.
+
+Every ``Produk`` row is indexed as its own document with id ``produk-<id>`` and metadata
+``source_type="produk"``, ``produk_id``, ``kategori`` (lowercased) and ``updated_at``.
+The stored ``updated_at`` is compared with the database to find products that changed
+or were deleted since the store was built.
+"""
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import database_models as models
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRODUK_SOURCE_TYPE = "produk"
+
+
+def produk_document_id(produk_id: int) -> str:
+    return f"produk-{produk_id}"
+
+
+def normalize_kategori(kategori: Optional[str]) -> str:
+    return (kategori or "").strip().lower()
+
+
+def _timestamp(value) -> str:
+    # Chroma metadata values cannot be None
+    return value.isoformat() if value else ""
+
+
+def produk_document(produk: models.Produk) -> Document:
+    """Render a product row as a searchable document (stock is left out, it is looked up live)"""
+    content = "\n".join(part for part in (
+        f"Produk: {produk.nama}",
+        f"Kategori: {produk.kategori}",
+        f"Harga: Rp {produk.harga:,.0f}".replace(",", "."),
+        produk.deskripsi or "",
+    ) if part)
+    return Document(
+        page_content=content,
+        metadata={
+            "source": f"produk/{produk.id}",
+            "source_type": PRODUK_SOURCE_TYPE,
+            "produk_id": produk.id,
+            "kategori": normalize_kategori(produk.kategori),
+            "updated_at": _timestamp(produk.updated_at),
+            "chunk_id": produk_document_id(produk.id),
+        }
+    )
+
+
+def iter_produk_documents() -> Iterator[Document]:
+    """Yield a document for every product; yields nothing when the database is unavailable"""
+    db = SessionLocal()
+    try:
+        for produk in db.query(models.Produk).order_by(models.Produk.id).yield_per(settings.EMBEDDING_BATCH_SIZE):
+            yield produk_document(produk)
+    except Exception as e:
+        logger.error(f"Error loading products for indexing: {str(e)}")
+    finally:
+        db.close()
+
+
+def catalogue_diff(vector_db) -> Tuple[List[int], List[str]]:
+    """Product ids that are new or changed since indexing, and document ids of deleted products"""
+    indexed = vector_db.get(where={"source_type": PRODUK_SOURCE_TYPE}, include=["metadatas"])
+    indexed_versions = {
+        metadata["produk_id"]: (document_id, metadata.get("updated_at", ""))
+        for document_id, metadata in zip(indexed["ids"], indexed["metadatas"])
+    }
+
+    db = SessionLocal()
+    try:
+        current = {produk_id: _timestamp(updated_at) for produk_id, updated_at in
+                   db.query(models.Produk.id, models.Produk.updated_at).all()}
+    finally:
+        db.close()
+
+    changed = [produk_id for produk_id, updated_at in current.items()
+               if indexed_versions.get(produk_id, (None, None))[1] != updated_at]
+    removed = [document_id for produk_id, (document_id, _) in indexed_versions.items() if produk_id not in current]
+    return changed, removed
+
+
+def sync_catalogue(vector_db) -> Dict[str, int]:
+    """Upsert changed products into the store and delete removed ones"""
+    changed, removed = catalogue_diff(vector_db)
+
+    db = SessionLocal()
+    try:
+        for start in range(0, len(changed), settings.EMBEDDING_BATCH_SIZE):
+            batch = changed[start:start + settings.EMBEDDING_BATCH_SIZE]
+            documents = [produk_document(produk) for produk in
+                         db.query(models.Produk).filter(models.Produk.id.in_(batch)).all()]
+            if documents:
+                vector_db.add_documents(documents, ids=[doc.metadata["chunk_id"] for doc in documents])
+    finally:
+        db.close()
+
+    if removed:
+        vector_db.delete(ids=removed)
+
+    logger.info(f"Catalogue sync: {len(changed)} products upserted, {len(removed)} removed")
+    return {"upserted": len(changed), "removed": len(removed)}
+
+
+def metadata_filter(intent_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Chroma where-filter narrowing the similarity search to the sources an intent needs"""
+    intent = intent_data.get("intent", "general")
+    entities = intent_data.get("entities") or {}
+
+    if intent in ("produk_info", "stok_check"):
+        conditions = [{"source_type": PRODUK_SOURCE_TYPE}]
+        try:
+            if entities.get("produk_id"):
+                conditions.append({"produk_id": int(entities["produk_id"])})
+            elif entities.get("kategori"):
+                conditions.append({"kategori": normalize_kategori(str(entities["kategori"]))})
+        except (TypeError, ValueError):
+            pass
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    if intent in ("order_status", "customer_orders", "faq"):
+        # Policies and how-tos live in the documents, not in the product catalogue
+        return {"source_type": {"$ne": PRODUK_SOURCE_TYPE}}
+
+    return None
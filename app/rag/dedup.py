@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.core.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Largest prime below 2**32, so every permuted hash fits in uint32 without overflow
+_PRIME = np.uint64(4294967291)
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse punctuation/whitespace so OCR and layout noise do not matter"""
+    return " ".join(_WORD_PATTERN.findall(text.lower()))
+
+
+def chunk_id(text: str) -> str:
+    """Deterministic id for a chunk, derived from its normalized content"""
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def provenance(document: Document) -> str:
+    """Short "source#page" reference for a chunk"""
+    source = document.metadata.get("source", "unknown")
+    page = document.metadata.get("page")
+    return f"{source}#p{page}" if page is not None else source
+
+
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Pick (bands, rows) minimizing false positives below and false negatives above the threshold"""
+    similarities = np.linspace(0.0, 1.0, 201)
+    best, best_error = (1, num_perm), float("inf")
+
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        candidate_probability = 1.0 - (1.0 - similarities ** rows) ** bands
+        below = similarities < threshold
+        error = candidate_probability[below].sum() + (1.0 - candidate_probability[~below]).sum()
+        if error < best_error:
+            best, best_error = (bands, rows), error
+
+    return best
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, using universal hashing modulo a 32-bit prime"""
+
+    def __init__(self, num_perm: int = 128, shingle_words: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> Set[bytes]:
+        words = normalize_text(text).split()
+        size = min(self.shingle_words, len(words)) or 1
+        return {" ".join(words[i:i + size]).encode("utf-8") for i in range(max(len(words) - size + 1, 1))}
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(shingle, digest_size=4).digest(), "little") for shingle in self.shingles(text)),
+            dtype=np.uint64,
+        )
+        # (a * x + b) mod p for every permutation and shingle, then the minimum per permutation
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+@dataclass
+class DedupStats:
+    total: int = 0
+    kept: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+
+    @property
+    def reduction_pct(self) -> float:
+        return round(100.0 * (self.total - self.kept) / self.total, 1) if self.total else 0.0
+
+
+class NearDuplicateFilter:
+    """Streaming MinHash/LSH filter that drops near-duplicate chunks and merges their provenance.
+
+    Every kept chunk gets a deterministic ``chunk_id`` and a ``sources`` metadata string
+    listing where its text (or a near-identical copy of it) appears.
+    """
+
+    def __init__(self, threshold: float = None, num_perm: int = None, shingle_words: int = None):
+        self.threshold = settings.DEDUP_JACCARD_THRESHOLD if threshold is None else threshold
+        self.hasher = MinHasher(
+            num_perm=num_perm or settings.DEDUP_NUM_PERM,
+            shingle_words=shingle_words or settings.DEDUP_SHINGLE_WORDS,
+        )
+        self.bands, self.rows = optimal_bands(self.threshold, self.hasher.num_perm)
+
+        self.stats = DedupStats()
+        self._exact: Dict[str, int] = {}
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(self.bands)]
+        self._signatures: List[np.ndarray] = []
+        # Metadata of kept chunks only (not their text), so memory stays small while streaming
+        self._kept: List[dict] = []
+        self._merged: Set[int] = set()
+
+    def _find_duplicate(self, signature: np.ndarray) -> Optional[int]:
+        candidates = set()
+        for band, buckets in enumerate(self._buckets):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            candidates.update(buckets.get(key, ()))
+
+        best, best_similarity = None, self.threshold
+        for candidate in candidates:
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        return best
+
+    def _merge(self, kept_index: int, duplicate: Document):
+        kept = self._kept[kept_index]
+        reference = provenance(duplicate)
+        sources = kept["sources"].split("|")
+        if reference not in sources:
+            kept["sources"] = "|".join(sources + [reference])
+        kept["duplicate_count"] = kept.get("duplicate_count", 0) + 1
+        self._merged.add(kept_index)
+
+    def filter(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """Yield only the first occurrence of each (near-)duplicate group"""
+        for document in documents:
+            self.stats.total += 1
+            identifier = chunk_id(document.page_content)
+
+            if identifier in self._exact:
+                self.stats.exact_duplicates += 1
+                self._merge(self._exact[identifier], document)
+                continue
+
+            signature = self.hasher.signature(document.page_content)
+            duplicate_of = self._find_duplicate(signature)
+            if duplicate_of is not None:
+                self.stats.near_duplicates += 1
+                self._merge(duplicate_of, document)
+                continue
+
+            index = len(self._kept)
+            document.metadata["chunk_id"] = identifier
+            document.metadata["sources"] = provenance(document)
+            self._exact[identifier] = index
+            self._signatures.append(signature)
+            self._kept.append(document.metadata)
+            for band, buckets in enumerate(self._buckets):
+                buckets[signature[band * self.rows:(band + 1) * self.rows].tobytes()].append(index)
+
+            self.stats.kept += 1
+            yield document
+
+    def provenance_updates(self) -> Tuple[List[str], List[dict]]:
+        """Ids and merged metadata of kept chunks that absorbed duplicates after being yielded"""
+        ids, metadatas = [], []
+        for index in sorted(self._merged):
+            ids.append(self._kept[index]["chunk_id"])
+            metadatas.append(dict(self._kept[index]))
+        return ids, metadatas
+
+    def report(self) -> str:
+        return (f"{self.stats.total} chunks -> {self.stats.kept} kept "
+                f"({self.stats.exact_duplicates} exact and {self.stats.near_duplicates} near duplicates dropped, "
+                f"{self.stats.reduction_pct}% smaller index)")
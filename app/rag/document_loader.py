@@ -1,9 +1,12 @@
 import os
-from typing import List, Dict, Any
+import re
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import logging
 
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
+from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
 
 from app.core.config import settings
 
@@ -11,60 +14,196 @@ from app.core.config import settings
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# File extension -> source type used for chunk sizing and metadata (see DOCUMENT_EXTENSIONS)
+SOURCE_TYPES = {
+    ".pdf": "pdf",
+    ".txt": "txt",
+    ".md": "txt",
+}
+
+
+def indexed_extensions() -> List[str]:
+    """Extensions from DOCUMENT_EXTENSIONS that the loader knows how to read"""
+    extensions = [extension.strip().lower() for extension in settings.DOCUMENT_EXTENSIONS.split(",") if extension.strip()]
+    unknown = [extension for extension in extensions if extension not in SOURCE_TYPES]
+    if unknown:
+        logger.warning(f"Ignoring unsupported document extensions: {', '.join(unknown)}")
+    return [extension for extension in extensions if extension in SOURCE_TYPES]
+
+# Lines that open a new section: markdown headings, "BAB ..." / numbered headings
+# such as "2.1 Pengiriman", and short all-caps titles
+_HEADING_PATTERN = re.compile(r"^(#{1,6}\s+\S.*|BAB\s+\S.*|\d+(\.\d+)+\.?\s+\S.*)$", re.IGNORECASE)
+
+# Rough word-piece count used when the embedding tokenizer is not available
+_APPROX_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    """Tokenizer of the embedding model, so chunk sizes match what actually gets embedded"""
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(settings.EMBEDDING_MODEL)
+    except Exception as e:
+        logger.warning(f"Embedding tokenizer unavailable, approximating token counts: {str(e)}")
+        return None
+
+
+def parse_chunk_sizes(value: str) -> Dict[str, Tuple[int, int]]:
+    """Parse "pdf=240:40,txt=128:16" into {source_type: (chunk_tokens, overlap_tokens)}"""
+    sizes = {}
+    for entry in value.split(","):
+        source_type, _, size = entry.partition("=")
+        if not size:
+            continue
+        chunk_tokens, _, overlap_tokens = size.partition(":")
+        sizes[source_type.strip()] = (int(chunk_tokens), int(overlap_tokens or 0))
+    return sizes
+
+
+def _is_heading(line: str) -> bool:
+    if not line or len(line) > 80:
+        return False
+    if _HEADING_PATTERN.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) >= 3 and line.isupper() and not line.endswith((".", ",", ";"))
+
+
+def split_sections(text: str, current_section: Optional[str]) -> Tuple[List[Tuple[Optional[str], str]], Optional[str]]:
+    """Split a page into (section title, text) blocks, carrying the open section over from earlier pages.
+
+    Also returns the section open at the end of the page, which differs from the last
+    block's when the page ends with a heading, so the next page can continue it.
+    """
+    blocks: List[Tuple[Optional[str], str]] = []
+    block: List[str] = []
+    has_body = False
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if _is_heading(line):
+            # Heading-only blocks (e.g. a chapter title directly followed by a sub-heading) are dropped
+            if has_body:
+                blocks.append((current_section, "\n".join(block)))
+            block, has_body = [], False
+            current_section = line.lstrip("#").strip()
+        elif line:
+            has_body = True
+        block.append(raw_line)
+
+    if has_body:
+        blocks.append((current_section, "\n".join(block)))
+    return blocks, current_section
+
+
 class DocumentProcessor:
     def __init__(self, documents_path: str = None):
         self.documents_path = documents_path or settings.DOCUMENTS_PATH
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-        )
-    
-    def load_pdf_documents(self) -> List[Dict[str, Any]]:
-        """Load PDF documents from the specified directory"""
-        logger.info(f"Loading PDF documents from {self.documents_path}")
-        
+        self.chunk_sizes = parse_chunk_sizes(settings.CHUNK_SIZES)
+        self._text_splitters: Dict[str, RecursiveCharacterTextSplitter] = {}
+
+    def _get_text_splitter(self, source_type: str) -> RecursiveCharacterTextSplitter:
+        """Token-aware splitter sized for the given source type"""
+        if source_type not in self._text_splitters:
+            chunk_tokens, overlap_tokens = self.chunk_sizes.get(source_type, self.chunk_sizes.get("default", (240, 40)))
+            tokenizer = get_tokenizer()
+
+            if tokenizer is not None:
+                splitter = RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+                    tokenizer,
+                    chunk_size=chunk_tokens,
+                    chunk_overlap=overlap_tokens,
+                )
+            else:
+                splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=chunk_tokens,
+                    chunk_overlap=overlap_tokens,
+                    length_function=lambda text: len(_APPROX_TOKEN_PATTERN.findall(text)),
+                )
+            self._text_splitters[source_type] = splitter
+        return self._text_splitters[source_type]
+
+    def iter_source_files(self) -> Iterator[str]:
+        """Yield supported document files in a stable order"""
         if not os.path.exists(self.documents_path):
             logger.warning(f"Documents directory {self.documents_path} does not exist, creating it")
             os.makedirs(self.documents_path, exist_ok=True)
-            return []
-        
-        try:
-            # Use DirectoryLoader to load all PDF files in the directory
-            loader = DirectoryLoader(
-                self.documents_path,
-                glob="**/*.pdf",
-                loader_cls=PyPDFLoader
-            )
-            documents = loader.load()
-            logger.info(f"Loaded {len(documents)} documents successfully")
-            return documents
-        except Exception as e:
-            logger.error(f"Error loading documents: {str(e)}")
-            return []
-    
+            return
+
+        extensions = indexed_extensions()
+        for root, dirs, files in os.walk(self.documents_path):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in extensions:
+                    yield os.path.join(root, name)
+
+    def iter_pages(self) -> Iterator[Document]:
+        """Lazily yield one page (or text file) at a time so memory stays bounded"""
+        logger.info(f"Loading documents from {self.documents_path}")
+
+        for path in self.iter_source_files():
+            source_type = SOURCE_TYPES[os.path.splitext(path)[1].lower()]
+            loader = PyPDFLoader(path) if source_type == "pdf" else TextLoader(path, encoding="utf-8")
+
+            try:
+                for page in loader.lazy_load():
+                    page.metadata["source_type"] = source_type
+                    yield page
+            except Exception as e:
+                logger.error(f"Error loading document {path}: {str(e)}")
+
+    def load_pdf_documents(self) -> List[Dict[str, Any]]:
+        """Load PDF documents from the specified directory"""
+        documents = [page for page in self.iter_pages() if page.metadata["source_type"] == "pdf"]
+        logger.info(f"Loaded {len(documents)} documents successfully")
+        return documents
+
+    def iter_chunks(self, pages: Iterable[Document] = None) -> Iterator[Document]:
+        """Split pages into token-sized chunks, keeping source, page and section metadata"""
+        current_source = None
+        current_section = None
+
+        for page in self.iter_pages() if pages is None else pages:
+            source = page.metadata.get("source")
+            if source != current_source:
+                current_source, current_section = source, None
+
+            source_type = page.metadata.get("source_type") or SOURCE_TYPES.get(os.path.splitext(source or "")[1].lower(), "default")
+            splitter = self._get_text_splitter(source_type)
+
+            blocks, current_section = split_sections(page.page_content, current_section)
+            for section, text in blocks:
+                metadata = dict(page.metadata, source_type=source_type)
+                if section:
+                    metadata["section"] = section
+
+                for chunk in splitter.split_text(text):
+                    yield Document(page_content=chunk, metadata=dict(metadata))
+
     def split_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Split documents into smaller chunks for better embedding"""
         if not documents:
             logger.warning("No documents to split")
             return []
-        
+
         try:
-            split_docs = self.text_splitter.split_documents(documents)
+            split_docs = list(self.iter_chunks(documents))
             logger.info(f"Split {len(documents)} documents into {len(split_docs)} chunks")
             return split_docs
         except Exception as e:
             logger.error(f"Error splitting documents: {str(e)}")
             return documents  # Return original documents if splitting fails
-    
+
     def process_documents(self) -> List[Dict[str, Any]]:
         """Load and process all documents"""
-        documents = self.load_pdf_documents()
-        if documents:
-            return self.split_documents(documents)
-        return []
+        return list(self.iter_chunks())
+
+# Function to stream processed documents chunk by chunk
+def iter_processed_documents() -> Iterator[Document]:
+    processor = DocumentProcessor()
+    return processor.iter_chunks()
 
 # Function to get processed documents
 def get_processed_documents() -> List[Dict[str, Any]]:
     processor = DocumentProcessor()
-    return processor.process_documents()
\ No newline at end of file
+    return processor.process_documents()
@@ -1,31 +1,48 @@
 import os
 import logging
-from typing import List, Dict, Any
+import uuid
+from functools import lru_cache
+from itertools import chain, islice
+from typing import List, Dict, Any, Callable, Iterable, Optional
 
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
     
-from app.rag.document_loader import get_processed_documents
+from app.rag.catalogue import iter_produk_documents
+from app.rag.dedup import NearDuplicateFilter
+from app.rag.document_loader import iter_processed_documents
+from app.rag.index_versions import active_vector_db_path
 from app.core.config import settings
+from app.core.memory import memory_registry, module_nbytes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=1)
+def get_embeddings() -> HuggingFaceEmbeddings:
+    """Load the embedding model once per process (shared with forked workers in preload mode)"""
+    embeddings = HuggingFaceEmbeddings(
+        model_name=settings.EMBEDDING_MODEL,
+        model_kwargs={'device': 'cpu'}
+    )
+    memory_registry.register("embedding_model", lambda: module_nbytes(embeddings.client))
+    return embeddings
+
 class DocumentEmbedder:
     def __init__(self, vector_db_path: str = None):
-        self.vector_db_path = vector_db_path or settings.VECTOR_DB_PATH
+        # Default to the version activated by the last re-index (VECTOR_DB_PATH before any)
+        self.vector_db_path = vector_db_path or active_vector_db_path()
         
         # Initialize embeddings model
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'}
-        )
+        self.embeddings = get_embeddings()
     
-    def create_vector_db(self, documents: List[Dict[str, Any]]) -> Chroma:
-        """Create or update vector database from documents"""
-        if not documents:
+    def create_vector_db(self, documents: Iterable[Dict[str, Any]], progress: Optional[Callable[[int], None]] = None) -> Chroma:
+        """Create or update vector database from documents, embedding them batch by batch"""
+        documents = iter(documents)
+        first = next(documents, None)
+        if first is None:
             logger.warning("No documents provided to create vector database")
             return None
         
@@ -34,15 +51,29 @@ class DocumentEmbedder:
         
         try:
             # Create vector store
-            vector_db = Chroma.from_documents(
-                documents=documents,
-                embedding=self.embeddings,
-                persist_directory=self.vector_db_path
+            vector_db = Chroma(
+                persist_directory=self.vector_db_path,
+                embedding_function=self.embeddings
             )
             
-            # Persist the database
-            vector_db.persist()
-            logger.info(f"Vector database created/updated successfully at {self.vector_db_path}")
+            # Stream chunks into the store so only one batch is held in memory
+            documents = chain([first], documents)
+            total = 0
+            while True:
+                batch = list(islice(documents, settings.EMBEDDING_BATCH_SIZE))
+                if not batch:
+                    break
+                # Deterministic ids where known (deduplicated chunks, produk-<id>), random otherwise
+                ids = [doc.metadata.get("chunk_id") or uuid.uuid4().hex for doc in batch]
+                vector_db.add_documents(batch, ids=ids)
+                total += len(batch)
+                if progress:
+                    progress(total)
+            
+            # Persist the database (newer Chroma versions persist automatically)
+            if hasattr(vector_db, "persist"):
+                vector_db.persist()
+            logger.info(f"Vector database created/updated successfully at {self.vector_db_path} with {total} chunks")
             return vector_db
         except Exception as e:
             logger.error(f"Error creating vector database: {str(e)}")
@@ -65,17 +96,97 @@ class DocumentEmbedder:
             logger.error(f"Error loading vector database: {str(e)}")
             return None
 
-def initialize_vector_db():
+def vector_db_identifier(vector_db) -> Optional[str]:
+    """Key of the Chroma system behind a store (its persist directory); stores opened on the same directory share it"""
+    return getattr(getattr(vector_db, "_client", None), "_identifier", None)
+
+def close_vector_db(vector_db=None, path: str = None):
+    """Stop the Chroma system behind a store (or a persist directory) and drop it from chromadb's client cache.
+
+    chromadb keeps one system per persist directory for the life of the process, so a
+    store that is no longer served would otherwise keep its sqlite handle and loaded
+    HNSW segments. The store, and every other store opened on the same directory, must
+    not be used afterwards.
+    """
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    identifier = path
+    if vector_db is not None:
+        identifier = vector_db_identifier(vector_db) or identifier
+    if identifier is None:
+        return
+
+    system = getattr(SharedSystemClient, "_identifier_to_system", {}).pop(identifier, None)
+    if system is None:
+        return
+    try:
+        system.stop()
+        logger.info(f"Closed vector database at {identifier}")
+    except Exception as e:
+        logger.error(f"Error closing vector database at {identifier}: {str(e)}")
+
+def copy_vector_db(source: Chroma, path: str) -> Chroma:
+    """Copy every row of a store into a new store at path, reading through the Chroma client.
+
+    Unlike copying the persist directory, this cannot catch the sqlite file or the HNSW
+    segments half-written, so the copy is a consistent snapshot of the source.
+    """
+    collection = source._collection
+    total = collection.count()
+    os.makedirs(path, exist_ok=True)
+    vector_db = Chroma(
+        persist_directory=path,
+        embedding_function=get_embeddings(),
+        collection_name=collection.name,
+        collection_metadata=collection.metadata
+    )
+    
+    copied = 0
+    for offset in range(0, total, settings.EMBEDDING_BATCH_SIZE):
+        batch = collection.get(include=["embeddings", "documents", "metadatas"],
+                               limit=settings.EMBEDDING_BATCH_SIZE, offset=offset)
+        if len(batch["ids"]) == 0:
+            break
+        vector_db._collection.add(ids=batch["ids"], embeddings=batch["embeddings"],
+                                  documents=batch["documents"], metadatas=batch["metadatas"])
+        copied += len(batch["ids"])
+    
+    if copied != total:
+        raise ValueError(f"Salinan vector database tidak lengkap: {copied} dari {total} chunk")
+    logger.info(f"Copied {copied} chunks from collection '{collection.name}' to {path}")
+    return vector_db
+
+def build_vector_db(embedder: DocumentEmbedder, progress: Optional[Callable[[int], None]] = None) -> Chroma:
+    """Run the ingestion pipeline (load, chunk, deduplicate, embed) into the embedder's path"""
+    documents = iter_processed_documents()
+    
+    dedup = NearDuplicateFilter() if settings.DEDUP_ENABLED else None
+    if dedup:
+        documents = dedup.filter(documents)
+    
+    # Product rows are indexed as they are; similar descriptions must keep their own produk_id
+    documents = chain(documents, iter_produk_documents())
+    
+    vector_db = embedder.create_vector_db(documents, progress=progress)
+    
+    if dedup and vector_db is not None:
+        # Chunks may have absorbed duplicates after their batch was written
+        ids, metadatas = dedup.provenance_updates()
+        if ids:
+            vector_db._collection.update(ids=ids, metadatas=metadatas)
+        logger.info(f"Deduplication: {dedup.report()}")
+    
+    return vector_db
+
+def initialize_vector_db(vector_db_path: str = None):
     """Initialize or update the vector database"""
-    embedder = DocumentEmbedder()
+    embedder = DocumentEmbedder(vector_db_path)
     
     # Try to load existing vector DB
     vector_db = embedder.load_vector_db()
     
     # If vector DB doesn't exist or is empty, create it
     if vector_db is None:
-        documents = get_processed_documents()
-        if documents:
-            vector_db = embedder.create_vector_db(documents)
+        vector_db = build_vector_db(embedder)
     
     return vector_db
\ No newline at end of file
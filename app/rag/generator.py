@@ -1,10 +1,17 @@
+import copy
 import logging
 import json
-from typing import Dict, Any, List, Optional
+import re
+import time
+from typing import Dict, Any, Iterator, List, Optional
 import requests
 
 from app.core.config import settings
+from app.core.memory import memory_registry
+from app.rag.catalogue import metadata_filter
+from app.rag.intent import IntentMetrics, build_intent_options, build_intent_prompt, parse_intent
 from app.rag.retriever import RAGRetriever
+from app.rag.singleflight import SingleFlight, StreamFlight, flight_key, flight_text
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,16 +22,21 @@ class ResponseGenerator:
         self.retriever = RAGRetriever()
         self.base_url = settings.OLLAMA_BASE_URL
         self.model = settings.OLLAMA_MODEL
-    
-    def _call_ollama_api(self, prompt: str, context: Optional[str] = None) -> str:
-        """Call Ollama API to generate response"""
-        url = f"{self.base_url}/api/generate"
+        self.intent_model = settings.INTENT_MODEL or settings.OLLAMA_MODEL
+        self.intent_metrics = IntentMetrics()
         
-        # Prepare payload
+        # Concurrent identical requests share one intent extraction and one generation
+        self.intent_flight = SingleFlight()
+        self.response_flight = SingleFlight()
+        self.stream_flight = StreamFlight()
+        memory_registry.register("stream_buffers", self.stream_flight.nbytes)
+    
+    def _build_payload(self, prompt: str, context: Optional[str] = None, stream: bool = False) -> Dict[str, Any]:
+        """Build the Ollama generate payload"""
         payload = {
             "model": self.model,
             "prompt": prompt,
-            "stream": False
+            "stream": stream
         }
         
         # Add context if provided
@@ -32,55 +44,76 @@ class ResponseGenerator:
             system_prompt = f"Anda adalah chatbot layanan pelanggan untuk Rumah Kreatif Toba. Gunakan informasi ini untuk menjawab pertanyaan pengguna: {context}"
             payload["system"] = system_prompt
         
+        return payload
+    
+    def _call_ollama_api(self, prompt: str, context: Optional[str] = None, raise_errors: bool = False) -> str:
+        """Call Ollama API to generate response.
+        With raise_errors, failures raise instead of returning an apology (batch runs must not record them as answers)."""
+        url = f"{self.base_url}/api/generate"
+        payload = self._build_payload(prompt, context)
+        
         try:
             response = requests.post(url, json=payload)
             response.raise_for_status()  # Raise exception for HTTP errors
             
             result = response.json()
+            if raise_errors and "response" not in result:
+                raise ValueError("Ollama response has no 'response' field")
             return result.get("response", "Maaf, saya tidak dapat menghasilkan respons saat ini.")
         except requests.exceptions.RequestException as e:
             logger.error(f"Error calling Ollama API: {str(e)}")
+            if raise_errors:
+                raise
             return "Maaf, terjadi kesalahan saat berkomunikasi dengan model bahasa."
     
-    def _extract_intent(self, query: str) -> Dict[str, Any]:
-        """Extract intent from user query"""
-        # Use Ollama to extract intent
-        prompt = f"""
-        Analisis pertanyaan berikut dan ekstrak intent dan entitas. 
-        Format output sebagai JSON dengan kunci 'intent' dan 'entities'.
-        
-        Pertanyaan: {query}
-        
-        Pilihan intent:
-        - produk_info (informasi produk)
-        - stok_check (cek stok barang)
-        - order_status (status pesanan)
-        - customer_orders (daftar pesanan pelanggan)
-        - faq (pertanyaan umum)
-        - general (pertanyaan umum tidak spesifik)
-        
-        Format entitas bisa produk_id, produk_nama, pesanan_id, pelanggan_id, kategori, dll
+    def _stream_ollama_api(self, prompt: str, context: Optional[str] = None) -> Iterator[str]:
+        """Call Ollama API and yield response tokens as they are generated"""
+        url = f"{self.base_url}/api/generate"
+        payload = self._build_payload(prompt, context, stream=True)
         
-        Output JSON:
-        """
+        try:
+            with requests.post(url, json=payload, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error calling Ollama API: {str(e)}")
+            yield "Maaf, terjadi kesalahan saat berkomunikasi dengan model bahasa."
+    
+    def _extract_intent(self, query: str) -> Dict[str, Any]:
+        """Extract intent from user query with a length-capped, format-constrained LLM call"""
+        mode = settings.INTENT_OUTPUT_MODE
+        payload = {
+            "model": self.intent_model,
+            "prompt": build_intent_prompt(query, mode),
+            "stream": False,
+            **build_intent_options(mode, settings.INTENT_NUM_PREDICT)
+        }
         
+        start = time.perf_counter()
         try:
-            response = self._call_ollama_api(prompt)
-            # Parse JSON from response
-            # Find JSON in response
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            
-            if start_idx >= 0 and end_idx > start_idx:
-                json_str = response[start_idx:end_idx]
-                intent_data = json.loads(json_str)
-                return intent_data
-            else:
-                # Fallback with simple heuristics
-                return self._fallback_intent_extraction(query)
-        except Exception as e:
+            response = requests.post(f"{self.base_url}/api/generate", json=payload, timeout=settings.INTENT_TIMEOUT_SECONDS)
+            response.raise_for_status()
+            result = response.json()
+        except requests.exceptions.RequestException as e:
             logger.error(f"Error extracting intent: {str(e)}")
+            self.intent_metrics.record((time.perf_counter() - start) * 1000, 0, parsed=False, request_failed=True)
+            return self._fallback_intent_extraction(query)
+        
+        latency_ms = (time.perf_counter() - start) * 1000
+        intent_data = parse_intent(result.get("response", ""), mode)
+        self.intent_metrics.record(latency_ms, result.get("eval_count", 0), parsed=intent_data is not None)
+        
+        if intent_data is None:
+            logger.warning(f"Unparseable intent output after {result.get('eval_count', 0)} tokens, using rules")
             return self._fallback_intent_extraction(query)
+        return intent_data
     
     def _fallback_intent_extraction(self, query: str) -> Dict[str, Any]:
         """Fallback method for intent extraction using simple rules"""
@@ -101,69 +134,87 @@ class ResponseGenerator:
         else:
             return {"intent": "general", "entities": {}}
     
-    def _retrieve_context(self, intent_data: Dict[str, Any]) -> str:
-        """Retrieve relevant context based on intent"""
+    def _extract_entities_by_rules(self, query: str) -> Dict[str, Any]:
+        """Pick numeric IDs mentioned after a keyword, such as pesanan 123 or produk #45"""
+        entities = {}
+        for keyword, entity in (("pesanan", "pesanan_id"), ("order", "pesanan_id"),
+                                ("produk", "produk_id"), ("pelanggan", "pelanggan_id")):
+            match = re.search(rf"{keyword}\s*(?:id\s*)?#?\s*(\d+)", query, re.IGNORECASE)
+            if match and entity not in entities:
+                entities[entity] = int(match.group(1))
+        return entities
+    
+    def _classify_bulk(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """Classify many queries without an LLM call per message (rules plus ID extraction)"""
+        results = []
+        for query in queries:
+            intent_data = self._fallback_intent_extraction(query)
+            intent_data["entities"] = self._extract_entities_by_rules(query)
+            intent_data["query"] = query
+            results.append(intent_data)
+        return results
+    
+    def _lookup_context(self, intent_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the database lookups needed for an intent"""
         intent = intent_data.get("intent", "general")
         entities = intent_data.get("entities", {})
         
-        context_parts = []
+        lookups = {}
         
-        if intent == "produk_info":
+        if intent in ("produk_info", "stok_check"):
             product_id = entities.get("produk_id")
             product_name = entities.get("produk_nama")
             
             if product_id or product_name:
-                product_info = self.retriever.retrieve_product_info(
+                lookups["product_info"] = self.retriever.retrieve_product_info(
                     product_name=product_name,
                     product_id=product_id
                 )
-                
-                if product_info:
-                    context_parts.append(f"Informasi Produk: {json.dumps(product_info, indent=2, ensure_ascii=False)}")
-        
-        elif intent == "stok_check":
-            product_id = entities.get("produk_id")
-            product_name = entities.get("produk_nama")
-            
-            if product_id or product_name:
-                product_info = self.retriever.retrieve_product_info(
-                    product_name=product_name,
-                    product_id=product_id
-                )
-                
-                if product_info:
-                    context_parts.append(f"Informasi Stok: Produk '{product_info['nama']}' memiliki stok sebanyak {product_info['stok']} unit.")
         
         elif intent == "order_status":
             order_id = entities.get("pesanan_id")
             
             if order_id:
-                order_info = self.retriever.retrieve_order_info(order_id)
-                
-                if order_info:
-                    context_parts.append(f"Informasi Pesanan: {json.dumps(order_info, indent=2, ensure_ascii=False)}")
+                lookups["order_info"] = self.retriever.retrieve_order_info(order_id)
         
         elif intent == "customer_orders":
             customer_id = entities.get("pelanggan_id")
             
             if customer_id:
-                orders = self.retriever.retrieve_customer_orders(customer_id)
-                
-                if orders:
-                    context_parts.append(f"Daftar Pesanan Pelanggan: {json.dumps(orders, indent=2, ensure_ascii=False)}")
+                lookups["orders"] = self.retriever.retrieve_customer_orders(customer_id)
         
         elif intent == "faq":
             category = entities.get("kategori")
             query_text = entities.get("query", "")
             
-            faqs = self.retriever.retrieve_faq(query=query_text, category=category)
-            
-            if faqs:
-                faq_text = "\n\n".join([f"Q: {faq['pertanyaan']}\nA: {faq['jawaban']}" for faq in faqs])
-                context_parts.append(f"Informasi FAQ yang relevan:\n{faq_text}")
+            lookups["faqs"] = self.retriever.retrieve_faq(query=query_text, category=category)
+        
+        return lookups
+    
+    def _format_context(self, intent_data: Dict[str, Any], lookups: Dict[str, Any], doc_chunks: List[str]) -> str:
+        """Render lookup results and document chunks into the context passed to the LLM"""
+        intent = intent_data.get("intent", "general")
+        context_parts = []
+        
+        product_info = lookups.get("product_info")
+        if product_info:
+            if intent == "stok_check":
+                context_parts.append(f"Informasi Stok: Produk '{product_info['nama']}' memiliki stok sebanyak {product_info['stok']} unit.")
+            else:
+                context_parts.append(f"Informasi Produk: {json.dumps(product_info, indent=2, ensure_ascii=False)}")
+        
+        order_info = lookups.get("order_info")
+        if order_info:
+            context_parts.append(f"Informasi Pesanan: {json.dumps(order_info, indent=2, ensure_ascii=False, default=str)}")
+        
+        orders = lookups.get("orders")
+        if orders:
+            context_parts.append(f"Ringkasan Pesanan Pelanggan: {json.dumps(orders, indent=2, ensure_ascii=False, default=str)}")
         
-        # Always add relevant document chunks from vector store
-        doc_chunks = self.retriever.retrieve_documents(query=intent_data.get("query", ""))
+        faqs = lookups.get("faqs")
+        if faqs:
+            faq_text = "\n\n".join([f"Q: {faq['pertanyaan']}\nA: {faq['jawaban']}" for faq in faqs])
+            context_parts.append(f"Informasi FAQ yang relevan:\n{faq_text}")
         
         if doc_chunks:
             context_parts.append("Informasi dari dokumen:")
@@ -172,27 +223,76 @@ class ResponseGenerator:
         
         return "\n\n".join(context_parts)
     
-    def generate_response(self, query: str) -> str:
-        """Generate response based on user query"""
-        try:
-            # Extract intent
-            intent_data = self._extract_intent(query)
-            intent_data["query"] = query  # Add original query
-            
-            logger.info(f"Extracted intent: {intent_data['intent']}")
-            
-            # Retrieve relevant context
-            context = self._retrieve_context(intent_data)
-            
-            # Generate response using LLM
-            prompt = f"""
+    def _retrieve_context(self, intent_data: Dict[str, Any]) -> str:
+        """Retrieve relevant context based on intent"""
+        lookups = self._lookup_context(intent_data)
+        
+        # Always add relevant document chunks from vector store, narrowed to the sources the intent needs
+        doc_chunks = self.retriever.retrieve_documents(
+            query=intent_data.get("query", ""),
+            where=metadata_filter(intent_data)
+        )
+        
+        return self._format_context(intent_data, lookups, doc_chunks)
+    
+    def _build_prompt(self, query: str) -> str:
+        """Build the generation prompt for a user query"""
+        return f"""
             Pengguna: {query}
             
             Berdasarkan informasi berikut, berikan respons yang tepat:
             """
+    
+    def _prepare(self, query: str) -> Dict[str, Any]:
+        """Extract intent, sharing the extraction between concurrent identical queries"""
+        intent_data, _ = self.intent_flight.do(flight_text(query), self._extract_intent, query)
+        
+        # Each caller gets its own copy since the pipeline annotates it
+        intent_data = copy.deepcopy(intent_data)
+        intent_data["query"] = query  # Add original query
+        
+        logger.info(f"Extracted intent: {intent_data['intent']}")
+        return intent_data
+    
+    def _answer(self, query: str, intent_data: Dict[str, Any]) -> str:
+        """Retrieve context and generate the full response"""
+        context = self._retrieve_context(intent_data)
+        return self._call_ollama_api(self._build_prompt(query), context=context)
+    
+    def _stream_answer(self, query: str, intent_data: Dict[str, Any]) -> Iterator[str]:
+        """Retrieve context and stream the response tokens"""
+        context = self._retrieve_context(intent_data)
+        yield from self._stream_ollama_api(self._build_prompt(query), context=context)
+    
+    def generate_response(self, query: str, user_id: Optional[str] = None) -> str:
+        """Generate response based on user query"""
+        try:
+            # Extract intent
+            intent_data = self._prepare(query)
+            
+            key = flight_key(query, intent_data, user_id)
+            if key is None:
+                return self._answer(query, intent_data)
             
-            response = self._call_ollama_api(prompt, context=context)
+            # Retrieve context and generate once for all identical in-flight requests
+            response, shared = self.response_flight.do(key, self._answer, query, intent_data)
+            if shared:
+                logger.info("Reused in-flight response for identical query")
             return response
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
-            return "Maaf, saya mengalami kesalahan saat memproses permintaan Anda. Mohon coba lagi nanti."
\ No newline at end of file
+            return "Maaf, saya mengalami kesalahan saat memproses permintaan Anda. Mohon coba lagi nanti."
+    
+    def generate_response_stream(self, query: str, user_id: Optional[str] = None) -> Iterator[str]:
+        """Stream the response tokens, fanning out one generation to identical in-flight requests"""
+        try:
+            intent_data = self._prepare(query)
+            
+            key = flight_key(query, intent_data, user_id)
+            if key is None:
+                yield from self._stream_answer(query, intent_data)
+            else:
+                yield from self.stream_flight.stream(key, lambda: self._stream_answer(query, intent_data))
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            yield "Maaf, saya mengalami kesalahan saat memproses permintaan Anda. Mohon coba lagi nanti."
@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+import re
+import shutil
+from datetime import datetime
+from typing import Any, Dict, List
+
+from app.core.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Version name of the original, unversioned store at VECTOR_DB_PATH
+LEGACY_VERSION = "legacy"
+
+_MANIFEST_NAME = "manifest.json"
+_VERSION_PATTERN = re.compile(r"v\d+")
+
+
+def _manifest_path() -> str:
+    return os.path.join(settings.VECTOR_DB_VERSIONS_PATH, _MANIFEST_NAME)
+
+
+def read_manifest() -> Dict[str, Any]:
+    """Active version and history (oldest first) of vector store versions"""
+    try:
+        with open(_manifest_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"active": LEGACY_VERSION, "history": [LEGACY_VERSION]}
+
+
+def write_manifest(manifest: Dict[str, Any]):
+    """Atomically replace the manifest so readers never see a partial file"""
+    os.makedirs(settings.VECTOR_DB_VERSIONS_PATH, exist_ok=True)
+    temp_path = f"{_manifest_path()}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, _manifest_path())
+
+
+def version_path(version: str) -> str:
+    if version == LEGACY_VERSION:
+        return settings.VECTOR_DB_PATH
+    return os.path.join(settings.VECTOR_DB_VERSIONS_PATH, version)
+
+
+def active_version() -> str:
+    return read_manifest()["active"]
+
+
+def active_vector_db_path() -> str:
+    return version_path(active_version())
+
+
+def new_version_name() -> str:
+    return datetime.utcnow().strftime("v%Y%m%d%H%M%S%f")
+
+
+def activate_version(version: str):
+    """Make a version active and append it to the history"""
+    manifest = read_manifest()
+    history = [v for v in manifest["history"] if v != version] + [version]
+    write_manifest({"active": version, "history": history})
+
+
+def rollback_version() -> str:
+    """Re-activate the version that was active before the current one"""
+    manifest = read_manifest()
+    history: List[str] = manifest["history"]
+    if len(history) < 2:
+        raise ValueError("Tidak ada versi sebelumnya untuk rollback")
+
+    previous = history[-2]
+    if not os.path.exists(version_path(previous)):
+        raise ValueError(f"Direktori versi {previous} sudah tidak ada")
+
+    write_manifest({"active": previous, "history": history[:-1]})
+    return previous
+
+
+def garbage_collect_versions(keep: int = None) -> List[str]:
+    """Delete versions beyond the newest `keep` in the history, plus orphaned build directories"""
+    keep = keep or settings.REINDEX_KEEP_VERSIONS
+    manifest = read_manifest()
+    retained = set(manifest["history"][-keep:]) | {manifest["active"]}
+
+    removed = []
+    manifest_history = [v for v in manifest["history"] if v in retained or v == LEGACY_VERSION]
+    if manifest_history != manifest["history"]:
+        write_manifest({"active": manifest["active"], "history": manifest_history})
+
+    if not os.path.isdir(settings.VECTOR_DB_VERSIONS_PATH):
+        return removed
+
+    for name in os.listdir(settings.VECTOR_DB_VERSIONS_PATH):
+        path = os.path.join(settings.VECTOR_DB_VERSIONS_PATH, name)
+        if name in retained or not _VERSION_PATTERN.fullmatch(name) or not os.path.isdir(path):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(name)
+
+    if removed:
+        logger.info(f"Removed old vector store versions: {', '.join(removed)}")
+    return removed
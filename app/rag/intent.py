@@ -0,0 +1,152 @@
+"""LLM intent extraction with structured (grammar-constrained) output.
+
+Output modes (INTENT_OUTPUT_MODE):
+- "schema": Ollama ``format`` is the JSON schema below, so the model can only emit a valid
+  object with a known intent and typed entities (requires Ollama 0.5 or newer)
+- "json": Ollama ``format: "json"`` (any JSON object), validated after parsing
+- "free": the original free-form prompt, with the JSON scraped out of the text and no
+  limits, kept as the baseline for benchmarks.intent_extraction
+
+The constrained modes are capped at INTENT_NUM_PREDICT tokens, which cuts off the
+whitespace runs constrained decoding can fall into. They use no stop sequence: the
+format constraint allows blank lines inside the object, and stopping on one would cut
+a valid object short.
+"""
+import json
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+INTENTS = ["produk_info", "stok_check", "order_status", "customer_orders", "faq", "general"]
+
+INTENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "enum": INTENTS},
+        "entities": {
+            "type": "object",
+            "properties": {
+                "produk_id": {"type": "integer"},
+                "produk_nama": {"type": "string"},
+                "pesanan_id": {"type": "integer"},
+                "pelanggan_id": {"type": "integer"},
+                "kategori": {"type": "string"},
+            },
+            "additionalProperties": False,
+        },
+    },
+    "required": ["intent", "entities"],
+    "additionalProperties": False,
+}
+
+_INTEGER_ENTITIES = ("produk_id", "pesanan_id", "pelanggan_id")
+
+_INTENT_DESCRIPTIONS = """- produk_info (informasi produk)
+- stok_check (cek stok barang)
+- order_status (status pesanan)
+- customer_orders (daftar pesanan pelanggan)
+- faq (pertanyaan umum)
+- general (pertanyaan umum tidak spesifik)"""
+
+
+def build_intent_prompt(query: str, mode: str) -> str:
+    if mode == "free":
+        return f"""
+        Analisis pertanyaan berikut dan ekstrak intent dan entitas.
+        Format output sebagai JSON dengan kunci 'intent' dan 'entities'.
+
+        Pertanyaan: {query}
+
+        Pilihan intent:
+        {_INTENT_DESCRIPTIONS}
+
+        Format entitas bisa produk_id, produk_nama, pesanan_id, pelanggan_id, kategori, dll
+
+        Output JSON:
+        """
+
+    # The output shape is enforced by the format constraint, so the prompt stays short
+    return (
+        "Klasifikasikan pertanyaan pelanggan Rumah Kreatif Toba. Jawab hanya dengan JSON "
+        "berisi 'intent' dan 'entities' (produk_id, produk_nama, pesanan_id, pelanggan_id, "
+        "kategori; hanya yang disebutkan).\n"
+        f"Pilihan intent:\n{_INTENT_DESCRIPTIONS}\n\n"
+        f"Pertanyaan: {query}"
+    )
+
+
+def build_intent_options(mode: str, num_predict: int) -> Dict[str, Any]:
+    """Ollama request fields that constrain the intent output"""
+    if mode == "free":
+        return {}
+    return {
+        "format": INTENT_SCHEMA if mode == "schema" else "json",
+        "options": {"num_predict": num_predict, "temperature": 0},
+    }
+
+
+def parse_intent(text: str, mode: str) -> Optional[Dict[str, Any]]:
+    """Parse and validate model output; None when it is not a usable intent object"""
+    if mode == "free":
+        # Scrape the outermost braces out of free-form text
+        start, end = text.find("{"), text.rfind("}") + 1
+        if start < 0 or end <= start:
+            return None
+        text = text[start:end]
+
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+    if not isinstance(data, dict) or data.get("intent") not in INTENTS:
+        return None
+
+    entities = data.get("entities")
+    if not isinstance(entities, dict):
+        entities = {}
+    for key in _INTEGER_ENTITIES:
+        if key in entities:
+            try:
+                entities[key] = int(entities[key])
+            except (TypeError, ValueError):
+                del entities[key]
+
+    return {"intent": data["intent"], "entities": {key: value for key, value in entities.items() if value not in (None, "")}}
+
+
+class IntentMetrics:
+    """Tokens generated, latency and parse failures of LLM intent extraction"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.parse_failures = 0
+        self.request_failures = 0
+        self.eval_tokens = 0
+        self._latencies_ms: deque = deque(maxlen=window)
+
+    def record(self, latency_ms: float, eval_tokens: int, parsed: bool, request_failed: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.eval_tokens += eval_tokens
+            self._latencies_ms.append(latency_ms)
+            if request_failed:
+                self.request_failures += 1
+            elif not parsed:
+                self.parse_failures += 1
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies_ms)
+            calls = self.calls or 1
+            return {
+                "calls": self.calls,
+                "parse_failures": self.parse_failures,
+                "parse_failure_rate": round(self.parse_failures / calls, 4),
+                "request_failures": self.request_failures,
+                "mean_eval_tokens": round(self.eval_tokens / calls, 1),
+                "latency_p50_ms": round(latencies[len(latencies) // 2], 1) if latencies else None,
+                "latency_p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1) if latencies else None,
+            }
+
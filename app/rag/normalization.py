@@ -0,0 +1,104 @@
+"""Normalization of customer queries before they are embedded.
+
+Lowercases, strips punctuation, symbols and emoji, expands common Indonesian chat
+abbreviations ("brp" -> "berapa", "gk" -> "tidak"), drops forms of address and filler
+particles ("kak", "min", "dong") and optionally stems with Sastrawi. Spelling variants
+of one question then map to the same text, so they share one cached embedding.
+"""
+import logging
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict
+
+from app.core.config import settings
+
+try:
+    from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+except ImportError:  # Sastrawi is optional; QUERY_STEMMING is ignored without it
+    StemmerFactory = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SLANG: Dict[str, str] = {
+    "brp": "berapa", "brapa": "berapa", "hrg": "harga", "hrga": "harga",
+    "gk": "tidak", "gak": "tidak", "ga": "tidak", "nggak": "tidak", "enggak": "tidak", "ngga": "tidak",
+    "tdk": "tidak", "tak": "tidak", "kagak": "tidak",
+    "yg": "yang", "dgn": "dengan", "utk": "untuk", "untk": "untuk", "dr": "dari", "dri": "dari",
+    "sdh": "sudah", "udh": "sudah", "udah": "sudah", "dah": "sudah", "blm": "belum", "belom": "belum",
+    "bs": "bisa", "bsa": "bisa", "krn": "karena", "karna": "karena", "tp": "tapi", "tpi": "tapi",
+    "gmn": "bagaimana", "gmna": "bagaimana", "gimana": "bagaimana", "bgmn": "bagaimana",
+    "knp": "kenapa", "kpn": "kapan", "dmn": "di mana", "dimana": "di mana",
+    "klo": "kalau", "kalo": "kalau", "kl": "kalau", "aja": "saja", "aj": "saja", "jg": "juga",
+    "lg": "lagi", "sm": "sama", "skrg": "sekarang", "trs": "terus", "mo": "mau", "pgn": "ingin",
+    "pengen": "ingin", "pesenan": "pesanan", "psn": "pesan", "brg": "barang", "byr": "bayar",
+    "ongkir": "ongkos kirim", "rek": "rekening", "tf": "transfer", "cod": "bayar di tempat",
+    "dll": "dan lain lain", "dsb": "dan sebagainya", "tsb": "tersebut", "sy": "saya", "aku": "saya",
+    "gw": "saya", "gue": "saya", "km": "kamu", "kmu": "kamu",
+}
+
+# Forms of address and particles that carry no meaning for retrieval
+FILLERS = {
+    "kak", "ka", "kakak", "min", "mimin", "gan", "agan", "sis", "sist", "bang", "bro", "om", "tante",
+    "dong", "deh", "sih", "nih", "kok", "ya", "yah", "yaa", "loh", "lho", "kah", "toh", "hehe", "wkwk",
+}
+
+# Thousands separators in prices ("150.000") go before punctuation is stripped
+_THOUSANDS = re.compile(r"(?<=\d)[.,](?=\d{3}\b)")
+_REPEATED = re.compile(r"([a-z])\1{2,}")
+
+
+def _parse_slang(spec: str) -> Dict[str, str]:
+    """Parse "brp=berapa,gk=tidak" into a mapping"""
+    slang = {}
+    for entry in spec.split(","):
+        word, _, replacement = entry.partition("=")
+        if word.strip():
+            slang[word.strip().lower()] = replacement.strip().lower()
+    return slang
+
+
+@lru_cache(maxsize=1)
+def _slang() -> Dict[str, str]:
+    return {**SLANG, **_parse_slang(settings.QUERY_SLANG)}
+
+
+@lru_cache(maxsize=1)
+def _stemmer():
+    if StemmerFactory is None:
+        logger.warning("QUERY_STEMMING is enabled but Sastrawi is not installed; skipping stemming")
+        return None
+    return StemmerFactory().create_stemmer()
+
+
+def _strip_symbols(text: str) -> str:
+    """Keep letters, digits and whitespace; punctuation, symbols and emoji become spaces"""
+    return "".join(char if unicodedata.category(char)[0] in "LN" or char.isspace() else " " for char in text)
+
+
+def normalize_query(text: str, stem: bool = None) -> str:
+    """Canonical form of a query for embedding and cache lookups"""
+    stem = settings.QUERY_STEMMING if stem is None else stem
+
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    normalized = _strip_symbols(_THOUSANDS.sub("", normalized))
+    # "bangettt" -> "banget", "kakkk" -> "kak"
+    normalized = _REPEATED.sub(r"\1", normalized)
+
+    slang = _slang()
+    words = []
+    for word in normalized.split():
+        word = slang.get(word, word)
+        if word and word not in FILLERS:
+            words.extend(word.split())
+    normalized = " ".join(words)
+
+    if stem and normalized:
+        stemmer = _stemmer()
+        if stemmer is not None:
+            normalized = stemmer.stem(normalized)
+
+    # A message of only greetings/emoji keeps its lowercased text rather than becoming empty
+    return normalized or text.strip().lower()
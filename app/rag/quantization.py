@@ -0,0 +1,214 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Number of set bits for every possible byte value, used to popcount XORed codes
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Rows scanned per block so the temporary XOR buffer stays small on large corpora
+_SCAN_BLOCK_SIZE = 65536
+
+# Metadata kept per row so filtered searches never ask the store for the matching ids
+FILTER_KEYS = ("source_type", "produk_id", "kategori")
+
+# Indexes built before workers fork, keyed by collection name (shared copy-on-write)
+_shared_indexes: Dict[str, "BinaryQuantizedIndex"] = {}
+
+
+def get_shared_index(collection_name: str) -> Optional["BinaryQuantizedIndex"]:
+    return _shared_indexes.get(collection_name)
+
+
+def set_shared_index(collection_name: str, index: Optional["BinaryQuantizedIndex"]):
+    if index is None:
+        _shared_indexes.pop(collection_name, None)
+    else:
+        _shared_indexes[collection_name] = index
+
+
+def pack_sign_bits(embeddings) -> np.ndarray:
+    """Binary-quantize embeddings to one sign bit per dimension, packed into bytes"""
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[np.newaxis, :]
+    return np.packbits(vectors > 0, axis=1)
+
+
+def encode_column(values: Iterable[Any], vocabulary: Dict[Any, int]) -> np.ndarray:
+    """Small integer codes for metadata values (-1 where the key is missing), growing the vocabulary as needed"""
+    return np.fromiter(
+        (-1 if value is None else vocabulary.setdefault(value, len(vocabulary)) for value in values),
+        dtype=np.int32
+    )
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    """Hamming distance between every packed code and a single packed query code"""
+    distances = np.empty(len(codes), dtype=np.uint16)
+    for start in range(0, len(codes), _SCAN_BLOCK_SIZE):
+        block = np.bitwise_xor(codes[start:start + _SCAN_BLOCK_SIZE], query_code)
+        distances[start:start + len(block)] = _POPCOUNT_TABLE[block].sum(axis=1, dtype=np.uint16)
+    return distances
+
+
+def rescore(query_embedding, vectors, space: str = "l2") -> np.ndarray:
+    """Full-precision distances (lower is better) using the collection's distance space"""
+    query = np.asarray(query_embedding, dtype=np.float32)
+    candidates = np.asarray(vectors, dtype=np.float32)
+
+    if space == "cosine":
+        query = query / (np.linalg.norm(query) or 1.0)
+        norms = np.linalg.norm(candidates, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return 1.0 - (candidates / norms) @ query
+    if space == "ip":
+        return 1.0 - candidates @ query
+    return ((candidates - query) ** 2).sum(axis=1)
+
+
+class BinaryQuantizedIndex:
+    """In-memory index of packed sign-bit codes used as a Hamming-distance prefilter"""
+
+    def __init__(self, ids: List[str], codes: np.ndarray, dimensions: int,
+                 filters: Optional[Dict[str, Tuple[np.ndarray, Dict[Any, int]]]] = None):
+        self.ids = ids
+        self.codes = codes
+        self.dimensions = dimensions
+        # FILTER_KEYS column -> (per-row value codes, value -> code)
+        self.filters = filters or {}
+        self._positions: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_embeddings(cls, ids: Sequence[str], embeddings,
+                        metadatas: Optional[Sequence[Optional[Dict[str, Any]]]] = None) -> "BinaryQuantizedIndex":
+        """Build an index from full-precision embeddings (and optionally their metadata) already in memory"""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        filters = {}
+        if metadatas is not None:
+            for key in FILTER_KEYS:
+                vocabulary: Dict[Any, int] = {}
+                filters[key] = (encode_column(((metadata or {}).get(key) for metadata in metadatas), vocabulary), vocabulary)
+        return cls(list(ids), pack_sign_bits(vectors), vectors.shape[1], filters)
+
+    @classmethod
+    def from_vector_db(cls, vector_db, batch_size: int = 5000) -> "BinaryQuantizedIndex":
+        """Build an index from a Chroma collection, reading embeddings and filter metadata batch by batch"""
+        collection = vector_db._collection
+        total = collection.count()
+
+        ids: List[str] = []
+        code_batches: List[np.ndarray] = []
+        vocabularies: Dict[str, Dict[Any, int]] = {key: {} for key in FILTER_KEYS}
+        column_batches: Dict[str, List[np.ndarray]] = {key: [] for key in FILTER_KEYS}
+        dimensions = 0
+
+        for offset in range(0, total, batch_size):
+            batch = collection.get(include=["embeddings", "metadatas"], limit=batch_size, offset=offset)
+            if len(batch["ids"]) == 0:
+                break
+            vectors = np.asarray(batch["embeddings"], dtype=np.float32)
+            dimensions = vectors.shape[1]
+            ids.extend(batch["ids"])
+            code_batches.append(pack_sign_bits(vectors))
+            metadatas = [metadata or {} for metadata in batch["metadatas"]]
+            for key in FILTER_KEYS:
+                column_batches[key].append(encode_column((metadata.get(key) for metadata in metadatas), vocabularies[key]))
+
+        if code_batches:
+            codes = np.concatenate(code_batches)
+        else:
+            codes = np.empty((0, 0), dtype=np.uint8)
+        filters = {
+            key: (np.concatenate(column_batches[key]) if code_batches else np.empty(0, dtype=np.int32), vocabularies[key])
+            for key in FILTER_KEYS
+        }
+
+        index = cls(ids, codes, dimensions, filters)
+        logger.info(f"Built binary index for collection '{collection.name}' with {len(ids)} vectors ({index.nbytes} bytes)")
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the packed codes and the filter columns"""
+        return int(self.codes.nbytes + sum(column.nbytes for column, _ in self.filters.values()))
+
+    def _rows(self, allowed_ids: Iterable[str]) -> np.ndarray:
+        """Positions of the given ids in the index (ids not in the index are ignored)"""
+        if self._positions is None:
+            self._positions = {identifier: i for i, identifier in enumerate(self.ids)}
+        positions = self._positions
+        return np.fromiter((positions[i] for i in allowed_ids if i in positions), dtype=np.int64)
+
+    def _condition_mask(self, key: str, condition: Any) -> Optional[np.ndarray]:
+        column, vocabulary = self.filters[key]
+        if isinstance(condition, dict):
+            if len(condition) != 1:
+                return None
+            operator, value = next(iter(condition.items()))
+        else:
+            operator, value = "$eq", condition
+
+        if operator in ("$eq", "$ne"):
+            values = [value]
+        elif operator in ("$in", "$nin"):
+            values = list(value)
+        else:
+            return None
+
+        wanted = np.array([vocabulary[v] for v in values if v in vocabulary], dtype=np.int32)
+        mask = np.isin(column, wanted)
+        if operator in ("$ne", "$nin"):
+            # Rows without the key match no condition on it
+            mask = ~mask & (column >= 0)
+        return mask
+
+    def filter_mask(self, where: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Row mask for a Chroma where-filter, or None when it uses a key or operator the index does not keep"""
+        masks = []
+        for key, condition in where.items():
+            if key in ("$and", "$or"):
+                parts = [self.filter_mask(part) for part in condition]
+                if not parts or any(part is None for part in parts):
+                    return None
+                masks.append(np.logical_and.reduce(parts) if key == "$and" else np.logical_or.reduce(parts))
+            elif key in self.filters:
+                mask = self._condition_mask(key, condition)
+                if mask is None:
+                    return None
+                masks.append(mask)
+            else:
+                return None
+        return np.logical_and.reduce(masks) if masks else None
+
+    def filter_rows(self, where: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Positions of the rows matching a where-filter, or None when the index cannot evaluate it"""
+        mask = self.filter_mask(where)
+        return None if mask is None else np.flatnonzero(mask)
+
+    def search(self, query_embedding, n: int, allowed_ids: Optional[Iterable[str]] = None,
+               rows: Optional[np.ndarray] = None) -> List[Tuple[str, int]]:
+        """Return up to n (id, hamming distance) candidates, nearest first, optionally among the given rows or ids only"""
+        if not self.ids or n <= 0:
+            return []
+
+        if rows is None and allowed_ids is not None:
+            rows = self._rows(allowed_ids)
+        codes = self.codes if rows is None else self.codes[rows]
+        if len(codes) == 0:
+            return []
+
+        distances = hamming_distances(codes, pack_sign_bits(query_embedding)[0])
+        n = min(n, len(distances))
+
+        top = np.argpartition(distances, n - 1)[:n]
+        top = top[np.argsort(distances[top], kind="stable")]
+        positions = top if rows is None else rows[top]
+        return [(self.ids[p], int(distances[i])) for p, i in zip(positions, top)]
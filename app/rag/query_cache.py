@@ -0,0 +1,222 @@
+"""Persistent cache from normalized query text to its embedding.
+
+Entries live in a SQLite file (QUERY_CACHE_PATH, WAL mode) so they survive restarts and
+are shared by every worker on the host, with a small in-process LRU in front of it for
+the hottest queries. The file is bounded to QUERY_CACHE_MAX_ENTRIES by dropping the
+least recently used rows. Keys include the embedding model name, so changing
+EMBEDDING_MODEL never serves vectors from the old model. The cache is best effort: any
+SQLite error is logged and treated as a miss.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.memory import memory_registry
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Puts between checks of the on-disk entry count
+_TRIM_EVERY = 256
+# Python object overhead per in-memory entry (key string, array header, dict slot)
+_ENTRY_OVERHEAD = 200
+
+
+class QueryEmbeddingCache:
+    """Size-bounded embedding cache: in-process LRU backed by a SQLite file shared across workers"""
+
+    def __init__(self, path: str = None, max_entries: int = None, memory_entries: int = None, model: str = None):
+        self.path = path or settings.QUERY_CACHE_PATH
+        self.max_entries = settings.QUERY_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.memory_entries = settings.QUERY_CACHE_MEMORY_ENTRIES if memory_entries is None else memory_entries
+        self.model = model or settings.EMBEDDING_MODEL
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._puts = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._execute(lambda connection: connection.executescript(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            "key TEXT PRIMARY KEY, query TEXT NOT NULL, embedding BLOB NOT NULL, last_used REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS ix_query_embeddings_last_used ON query_embeddings (last_used);"
+        ))
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread (and process, after a fork) that opened them
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _execute(self, operation: Callable[[sqlite3.Connection], Any], default: Any = None) -> Any:
+        try:
+            return operation(self._connection())
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.error(f"Error accessing query embedding cache: {str(e)}")
+            return default
+
+    def key(self, query: str) -> str:
+        return hashlib.sha1(f"{self.model}\0{query}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, embedding: np.ndarray):
+        if not self.memory_entries:
+            return
+        with self._lock:
+            self._memory[key] = embedding
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_many(self, queries: List[str]) -> Dict[str, List[float]]:
+        """Cached embeddings of the given (normalized) queries; misses are left out"""
+        keys = {query: self.key(query) for query in dict.fromkeys(queries)}
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for query, key in keys.items():
+                embedding = self._memory.get(key)
+                if embedding is not None:
+                    self._memory.move_to_end(key)
+                    found[query] = embedding
+            self.memory_hits += len(found)
+
+        pending = {keys[query]: query for query in keys if query not in found}
+        if pending:
+            def load(connection):
+                placeholders = ",".join("?" * len(pending))
+                rows = connection.execute(
+                    f"SELECT key, embedding FROM query_embeddings WHERE key IN ({placeholders})", list(pending)
+                ).fetchall()
+                if rows:
+                    now = time.time()
+                    connection.executemany("UPDATE query_embeddings SET last_used = ? WHERE key = ?",
+                                           [(now, key) for key, _ in rows])
+                return rows
+
+            for key, blob in self._execute(load, default=[]):
+                embedding = np.frombuffer(blob, dtype=np.float32)
+                found[pending[key]] = embedding
+                self._remember(key, embedding)
+
+            with self._lock:
+                self.disk_hits += sum(1 for key in pending if pending[key] in found)
+                self.misses += sum(1 for key in pending if pending[key] not in found)
+
+        return {query: embedding.tolist() for query, embedding in found.items()}
+
+    def put_many(self, embeddings: Dict[str, List[float]]):
+        """Store embeddings of (normalized) queries"""
+        if not embeddings:
+            return
+        now = time.time()
+        rows = []
+        for query, embedding in embeddings.items():
+            key = self.key(query)
+            vector = np.asarray(embedding, dtype=np.float32)
+            self._remember(key, vector)
+            rows.append((key, query, vector.tobytes(), now))
+
+        self._execute(lambda connection: connection.executemany(
+            "INSERT OR REPLACE INTO query_embeddings (key, query, embedding, last_used) VALUES (?, ?, ?, ?)", rows
+        ))
+
+        with self._lock:
+            self._puts += len(rows)
+            trim = self._puts >= _TRIM_EVERY
+            if trim:
+                self._puts = 0
+        if trim:
+            self.trim()
+
+    def trim(self) -> int:
+        """Drop the least recently used rows beyond max_entries (plus 10% headroom)"""
+        def delete_oldest(connection):
+            count = connection.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+            excess = count - self.max_entries
+            if excess <= 0:
+                return 0
+            excess += self.max_entries // 10
+            connection.execute(
+                "DELETE FROM query_embeddings WHERE key IN "
+                "(SELECT key FROM query_embeddings ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            return excess
+
+        return self._execute(delete_oldest, default=0)
+
+    def embed(self, queries: List[str], embed_documents: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        """Embeddings of the given (normalized) queries, encoding only the ones not cached"""
+        cached = self.get_many(queries)
+        missing = [query for query in dict.fromkeys(queries) if query not in cached]
+        if missing:
+            computed = dict(zip(missing, embed_documents(missing)))
+            self.put_many(computed)
+            cached.update(computed)
+        return [cached[query] for query in queries]
+
+    def memory_nbytes(self) -> int:
+        with self._lock:
+            return sum(embedding.nbytes + _ENTRY_OVERHEAD for embedding in self._memory.values())
+
+    def evict_memory(self, target_bytes: int) -> int:
+        """Drop least recently used in-memory entries until the rest fits (the disk copy stays)"""
+        freed = 0
+        with self._lock:
+            size = sum(embedding.nbytes + _ENTRY_OVERHEAD for embedding in self._memory.values())
+            while self._memory and size - freed > target_bytes:
+                _, embedding = self._memory.popitem(last=False)
+                freed += embedding.nbytes + _ENTRY_OVERHEAD
+        return freed
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        entries = self._execute(lambda connection: connection.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0])
+        return {
+            "pid": os.getpid(),
+            "lookups": lookups,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else None,
+            "errors": self.errors,
+            "memory_entries": len(self._memory),
+            "disk_entries": entries,
+            "max_entries": self.max_entries,
+            "path": self.path,
+        }
+
+
+_cache: Optional[QueryEmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> Optional[QueryEmbeddingCache]:
+    """The process-wide cache, opened on first use (None when QUERY_CACHE_ENABLED is off)"""
+    global _cache
+    if not settings.QUERY_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = QueryEmbeddingCache()
+            memory_registry.register("query_embedding_cache", _cache.memory_nbytes, evict=_cache.evict_memory)
+        return _cache
@@ -0,0 +1,330 @@
+"""Zero-downtime re-indexing of the document vector store.
+
+A job builds a new version directory next to the live store, validates it with the
+smoke queries from REINDEX_SMOKE_QUERIES and only then makes it active by atomically
+replacing the version manifest. The worker that ran the job swaps the new store into
+its retriever immediately; every other worker notices the manifest change within
+REINDEX_POLL_SECONDS. Chat keeps being answered from the old version throughout.
+
+A "full" job re-runs the whole ingestion pipeline. A "catalogue" job snapshots the active
+version row by row through the Chroma client and only applies the products changed in
+the database since it was built. Every CATALOGUE_SYNC_SECONDS the worker that gets the
+re-index lock compares the catalogue with the database and starts such a job, still
+holding the lock, when products changed; the other workers skip the check.
+"""
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.startup import components
+from app.rag import index_versions
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _jobs_path() -> str:
+    return os.path.join(settings.VECTOR_DB_VERSIONS_PATH, "jobs")
+
+
+@dataclass
+class ReindexJob:
+    id: str
+    version: str
+    # "full" (documents and products) or "catalogue" (products changed since the active version)
+    scope: str = "full"
+    # queued -> building -> validating -> activating -> done, or failed (or skipped when nothing changed)
+    status: str = "queued"
+    chunks_embedded: int = 0
+    validation: Dict[str, Any] = field(default_factory=dict)
+    catalogue: Dict[str, int] = field(default_factory=dict)
+    error: Optional[str] = None
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    finished_at: Optional[str] = None
+
+    def save(self):
+        """Persist the job state so its progress is visible from every worker"""
+        os.makedirs(_jobs_path(), exist_ok=True)
+        path = os.path.join(_jobs_path(), f"{self.id}.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f)
+        os.replace(f"{path}.tmp", path)
+
+
+def load_job(job_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(_jobs_path(), f"{os.path.basename(job_id)}.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def recent_jobs(limit: int = 10) -> List[Dict[str, Any]]:
+    if not os.path.isdir(_jobs_path()):
+        return []
+    jobs = []
+    for name in os.listdir(_jobs_path()):
+        if name.endswith(".json"):
+            job = load_job(name[:-len(".json")])
+            if job:
+                jobs.append(job)
+    return sorted(jobs, key=lambda job: job["created_at"], reverse=True)[:limit]
+
+
+def validate_vector_db(vector_db, live_chunks: int = 0) -> Dict[str, Any]:
+    """Raise ValueError unless a freshly built store looks complete and answers the smoke queries"""
+    chunks = vector_db._collection.count()
+    if chunks == 0:
+        raise ValueError("Versi baru tidak berisi dokumen")
+    if live_chunks and chunks < live_chunks * settings.REINDEX_MIN_CHUNK_RATIO:
+        raise ValueError(f"Versi baru hanya berisi {chunks} chunk, versi aktif {live_chunks}")
+
+    queries = [query.strip() for query in settings.REINDEX_SMOKE_QUERIES.split("|") if query.strip()]
+    failed = [query for query in queries if not vector_db.similarity_search(query, k=1)]
+    if failed:
+        raise ValueError(f"Smoke query tanpa hasil: {', '.join(failed)}")
+
+    return {"chunks": chunks, "live_chunks": live_chunks, "smoke_queries": len(queries)}
+
+
+class ReindexManager:
+    """Runs at most one re-index job at a time across all worker processes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lock_file = None
+
+    def _acquire(self) -> bool:
+        """Take the inter-process re-index lock without blocking"""
+        os.makedirs(settings.VECTOR_DB_VERSIONS_PATH, exist_ok=True)
+        lock_file = open(os.path.join(settings.VECTOR_DB_VERSIONS_PATH, ".reindex.lock"), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _release(self):
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def start(self, scope: str = "full") -> ReindexJob:
+        """Start a background re-index job; raises RuntimeError if one is already running"""
+        if scope not in ("full", "catalogue"):
+            raise ValueError(f"Scope re-index tidak dikenal: {scope}")
+        with self._lock:
+            if not self._acquire():
+                raise RuntimeError("Re-index sedang berjalan")
+        return self._launch(scope)
+
+    def _launch(self, scope: str) -> ReindexJob:
+        """Run a job in the background; the caller holds the re-index lock, which the job releases"""
+        job = ReindexJob(id=uuid.uuid4().hex[:12], version=index_versions.new_version_name(), scope=scope)
+        job.save()
+        threading.Thread(target=self._run, args=(job,), name=f"reindex-{job.id}", daemon=True).start()
+        return job
+
+    def _build_catalogue(self, job: ReindexJob, path: str):
+        """Snapshot the active version and apply only the product changes to the copy"""
+        from app.rag.catalogue import sync_catalogue
+        from app.rag.embedder import DocumentEmbedder, close_vector_db, copy_vector_db
+
+        # Read through the client rather than copying files the live store may be flushing
+        retriever = self._retriever()
+        if retriever is not None and retriever.version == index_versions.active_version():
+            with retriever.using_vector_db() as source:
+                if source is None:
+                    raise ValueError("Gagal membuka vector database aktif")
+                vector_db = copy_vector_db(source, path)
+        else:
+            source_path = index_versions.active_vector_db_path()
+            source = DocumentEmbedder(vector_db_path=source_path).load_vector_db()
+            if source is None:
+                raise ValueError("Gagal membuka vector database aktif")
+            try:
+                vector_db = copy_vector_db(source, path)
+            finally:
+                # A retired store still finishing searches may have that directory open too
+                if retriever is None or not retriever.path_in_use(source_path):
+                    close_vector_db(source, path=source_path)
+
+        job.catalogue = sync_catalogue(vector_db)
+        job.chunks_embedded = job.catalogue["upserted"]
+        return vector_db
+
+    def _run(self, job: ReindexJob):
+        from app.rag.embedder import DocumentEmbedder, build_vector_db, close_vector_db
+
+        path = index_versions.version_path(job.version)
+        vector_db = None
+        try:
+            job.status = "building"
+            job.save()
+
+            def progress(total: int):
+                job.chunks_embedded = total
+                job.save()
+
+            if job.scope == "catalogue":
+                vector_db = self._build_catalogue(job, path)
+                if not any(job.catalogue.values()):
+                    job.status = "skipped"
+                    close_vector_db(vector_db, path=path)
+                    shutil.rmtree(path, ignore_errors=True)
+                    return
+            else:
+                vector_db = build_vector_db(DocumentEmbedder(vector_db_path=path), progress=progress)
+            if vector_db is None:
+                raise ValueError("Gagal membangun vector database baru")
+
+            job.status = "validating"
+            job.save()
+            job.validation = validate_vector_db(vector_db, self._live_chunks())
+
+            job.status = "activating"
+            job.save()
+            index_versions.activate_version(job.version)
+            self._swap(vector_db, job.version)
+            index_versions.garbage_collect_versions()
+
+            job.status = "done"
+            logger.info(f"Re-index {job.id} activated version {job.version}: {job.validation}")
+        except Exception as e:
+            logger.error(f"Error in re-index job {job.id}: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+            # The live version is untouched; close and drop the partial build
+            if index_versions.active_version() != job.version:
+                close_vector_db(vector_db, path=path)
+                shutil.rmtree(path, ignore_errors=True)
+        finally:
+            job.finished_at = datetime.utcnow().isoformat()
+            job.save()
+            with self._lock:
+                self._release()
+
+    def _retriever(self):
+        response_generator = components.get("response_generator")
+        return response_generator.retriever if response_generator is not None else None
+
+    def _live_chunks(self) -> int:
+        retriever = self._retriever()
+        if retriever is None:
+            return 0
+        with retriever.using_vector_db() as vector_db:
+            return vector_db._collection.count() if vector_db is not None else 0
+
+    def _swap(self, vector_db, version: str):
+        retriever = self._retriever()
+        if retriever is not None:
+            retriever.swap_vector_db(vector_db, version)
+
+    def rollback(self) -> str:
+        """Re-activate the previous version; raises ValueError when there is none"""
+        with self._lock:
+            if not self._acquire():
+                raise RuntimeError("Re-index sedang berjalan")
+            try:
+                version = index_versions.rollback_version()
+            finally:
+                self._release()
+        self.sync()
+        return version
+
+    def sync(self):
+        """Load the active version into this worker's retriever if it is serving another one"""
+        retriever = self._retriever()
+        if retriever is None:
+            return
+
+        version = index_versions.active_version()
+        if retriever.version == version:
+            return
+
+        from app.rag.embedder import DocumentEmbedder
+
+        vector_db = DocumentEmbedder(vector_db_path=index_versions.version_path(version)).load_vector_db()
+        if vector_db is not None:
+            self._swap(vector_db, version)
+
+    def status(self) -> Dict[str, Any]:
+        manifest = index_versions.read_manifest()
+        retriever = self._retriever()
+        return {
+            "active": manifest["active"],
+            "history": manifest["history"],
+            "serving": retriever.version if retriever is not None else None,
+            "jobs": recent_jobs(),
+        }
+
+    def catalogue_changed(self) -> bool:
+        """Whether products changed in the database since the served version was built"""
+        from app.rag.catalogue import catalogue_diff
+
+        retriever = self._retriever()
+        if retriever is None:
+            return False
+        with retriever.using_vector_db() as vector_db:
+            if vector_db is None:
+                return False
+            changed, removed = catalogue_diff(vector_db)
+        return bool(changed or removed)
+
+    def _sync_catalogue(self) -> Optional[ReindexJob]:
+        """Start a catalogue job when products changed, checking only if this worker gets the re-index lock"""
+        with self._lock:
+            if not self._acquire():
+                return None  # another worker is re-indexing or checking
+        try:
+            changed = self.catalogue_changed()
+        except Exception:
+            with self._lock:
+                self._release()
+            raise
+        if not changed:
+            with self._lock:
+                self._release()
+            return None
+        return self._launch("catalogue")
+
+    def _watch(self):
+        last_catalogue_check = time.monotonic()
+        while True:
+            time.sleep(settings.REINDEX_POLL_SECONDS)
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Error syncing vector store version: {str(e)}")
+
+            if not settings.CATALOGUE_SYNC_SECONDS or time.monotonic() - last_catalogue_check < settings.CATALOGUE_SYNC_SECONDS:
+                continue
+            last_catalogue_check = time.monotonic()
+            try:
+                job = self._sync_catalogue()
+                if job is not None:
+                    logger.info(f"Products changed, started catalogue re-index {job.id}")
+            except Exception as e:
+                logger.error(f"Error checking product catalogue: {str(e)}")
+
+    def start_watcher(self) -> threading.Thread:
+        """Follow versions activated (or rolled back) by other worker processes"""
+        thread = threading.Thread(target=self._watch, name="reindex-watcher", daemon=True)
+        thread.start()
+        return thread
+
+
+reindex_manager = ReindexManager()
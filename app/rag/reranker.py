@@ -0,0 +1,215 @@
+"""Cross-encoder reranking of vector search candidates.
+
+The retriever over-fetches RERANK_CANDIDATES chunks and the cross-encoder (RERANK_MODEL,
+on CPU) scores the query against them. To keep the cost low:
+
+- Adaptive depth: only the first RERANK_MIN_CANDIDATES are scored at first. The rest
+  are scored only when the weakest scored candidate is still within RERANK_EXPAND_MARGIN
+  of the k-th best, i.e. when deeper candidates could still make the cut.
+- Every pair that is scored goes into one predict call per pass (and per batch of
+  queries).
+- Scores are cached in an LRU keyed on (query hash, chunk id + content digest).
+- After scoring, chunks more than RERANK_KEEP_MARGIN below the best are dropped, so
+  the prompt gets fewer but better chunks.
+
+Latency guard: when RERANK_MAX_CONCURRENT reranks are already running, or the recent
+scoring latency exceeds RERANK_BUDGET_MS, the bi-encoder order is returned unchanged.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from app.core.config import settings
+from app.core.memory import memory_registry, module_nbytes
+from app.rag.normalization import normalize_query
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Python object overhead per cached score (two key strings, tuple, float, dict slot)
+_SCORE_ENTRY_BYTES = 250
+
+
+@lru_cache(maxsize=1)
+def get_cross_encoder():
+    """Load the cross-encoder once per process"""
+    from sentence_transformers import CrossEncoder
+
+    model = CrossEncoder(settings.RERANK_MODEL, max_length=settings.RERANK_MAX_LENGTH, device="cpu")
+    memory_registry.register("rerank_model", lambda: module_nbytes(model.model))
+    return model
+
+
+def chunk_key(document: Document) -> str:
+    """Cache key of a chunk: its id plus a digest of the content (product chunks keep their id when edited)"""
+    digest = hashlib.blake2b(document.page_content.encode("utf-8"), digest_size=8).hexdigest()
+    return f"{(document.metadata or {}).get('chunk_id', '')}:{digest}"
+
+
+class CrossEncoderReranker:
+    """Reranks retrieved chunks with a cross-encoder under a latency budget"""
+
+    def __init__(self, model=None):
+        self._model = model
+        self._lock = threading.Lock()
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._in_flight = 0
+        self._latencies_ms: deque = deque(maxlen=50)
+        self.reranked = 0
+        self.expanded = 0
+        self.skipped_load = 0
+        self.skipped_errors = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        memory_registry.register("rerank_cache", self.cache_nbytes, evict=self.evict_cache)
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = get_cross_encoder()
+        return self._model
+
+    def _recent_latency_ms(self) -> float:
+        """Median of the recent scoring latencies; call under _lock"""
+        latencies = sorted(self._latencies_ms)
+        return latencies[len(latencies) // 2] if latencies else 0.0
+
+    def _acquire(self) -> bool:
+        """Admit a rerank unless the worker is saturated or reranking has been too slow lately"""
+        with self._lock:
+            over_budget = self._recent_latency_ms() > settings.RERANK_BUDGET_MS
+            if self._in_flight >= settings.RERANK_MAX_CONCURRENT or over_budget:
+                self.skipped_load += 1
+                if over_budget and self._latencies_ms:
+                    # Age out one sample per skip so reranking is retried once the slow samples are gone
+                    self._latencies_ms.popleft()
+                return False
+            self._in_flight += 1
+            return True
+
+    def _release(self, started: float):
+        with self._lock:
+            self._in_flight -= 1
+            self._latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    def _score(self, pairs: List[Tuple[str, str, str, str]]) -> Dict[Tuple[str, str], float]:
+        """Scores for (query_key, chunk_key, query, content) pairs, predicting only the uncached ones in one call"""
+        scores: Dict[Tuple[str, str], float] = {}
+        missing: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        with self._lock:
+            for query_key, key, query, content in pairs:
+                cached = self._scores.get((query_key, key))
+                if cached is not None:
+                    self._scores.move_to_end((query_key, key))
+                    scores[(query_key, key)] = cached
+                else:
+                    missing[(query_key, key)] = (query, content)
+            self.cache_hits += len(scores)
+            self.cache_misses += len(missing)
+
+        if missing:
+            predicted = self.model.predict(list(missing.values()), batch_size=settings.RERANK_BATCH_SIZE,
+                                           show_progress_bar=False)
+            with self._lock:
+                for cache_key, score in zip(missing, predicted):
+                    scores[cache_key] = float(score)
+                    self._scores[cache_key] = float(score)
+                while len(self._scores) > settings.RERANK_CACHE_ENTRIES:
+                    self._scores.popitem(last=False)
+        return scores
+
+    def _select(self, scored: List[Tuple[float, Document]], k: int) -> List[Document]:
+        """Top k by score, dropping chunks far below the best one"""
+        scored = sorted(scored, key=lambda item: -item[0])[:k]
+        best = scored[0][0]
+        return [document for score, document in scored if best - score <= settings.RERANK_KEEP_MARGIN]
+
+    def rerank_batch(self, queries: Sequence[str], candidates: Sequence[List[Document]], k: int) -> List[List[Document]]:
+        """Rerank the candidates of many queries; falls back to the bi-encoder order when skipped"""
+        fallback = [list(documents[:k]) for documents in candidates]
+        if not any(len(documents) > 1 for documents in candidates) or not self._acquire():
+            return fallback
+
+        started = time.perf_counter()
+        try:
+            texts = [normalize_query(query, stem=False) if settings.QUERY_NORMALIZATION else query for query in queries]
+            query_keys = [hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest() for text in texts]
+            keys = [[chunk_key(document) for document in documents] for documents in candidates]
+
+            def pairs_for(i: int, start: int, end: int):
+                return [(query_keys[i], key, texts[i], document.page_content)
+                        for key, document in zip(keys[i][start:end], candidates[i][start:end])]
+
+            # First pass: the shallow head of every query's candidates
+            depth = settings.RERANK_MIN_CANDIDATES
+            scores = self._score([pair for i in range(len(queries)) for pair in pairs_for(i, 0, depth)])
+
+            # Second pass: go deeper only where the weakest scored candidate could still make the top k
+            deeper = []
+            for i, documents in enumerate(candidates):
+                if len(documents) <= depth:
+                    continue
+                head = sorted((scores[(query_keys[i], key)] for key in keys[i][:depth]), reverse=True)
+                kth = head[min(k, len(head)) - 1]
+                if kth - head[-1] <= settings.RERANK_EXPAND_MARGIN:
+                    deeper.append(i)
+            budget_left = (time.perf_counter() - started) * 1000 < settings.RERANK_BUDGET_MS / 2
+            if deeper and budget_left:
+                scores.update(self._score([pair for i in deeper for pair in pairs_for(i, depth, None)]))
+                with self._lock:
+                    self.expanded += len(deeper)
+
+            results = []
+            for i, documents in enumerate(candidates):
+                scored = [(scores[(query_keys[i], key)], document)
+                          for key, document in zip(keys[i], documents) if (query_keys[i], key) in scores]
+                results.append(self._select(scored, k) if scored else fallback[i])
+            with self._lock:
+                self.reranked += len(queries)
+            return results
+        except Exception as e:
+            logger.error(f"Error reranking documents: {str(e)}")
+            with self._lock:
+                self.skipped_errors += 1
+            return fallback
+        finally:
+            self._release(started)
+
+    def rerank(self, query: str, documents: List[Document], k: int) -> List[Document]:
+        return self.rerank_batch([query], [documents], k)[0]
+
+    def cache_nbytes(self) -> int:
+        return len(self._scores) * _SCORE_ENTRY_BYTES
+
+    def evict_cache(self, target_bytes: int) -> int:
+        """Drop least recently used scores until the cache fits"""
+        freed = 0
+        with self._lock:
+            while self._scores and (len(self._scores) * _SCORE_ENTRY_BYTES) > target_bytes:
+                self._scores.popitem(last=False)
+                freed += _SCORE_ENTRY_BYTES
+        return freed
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        with self._lock:
+            latencies = sorted(self._latencies_ms)
+            return {
+                "reranked": self.reranked,
+                "expanded": self.expanded,
+                "skipped_load": self.skipped_load,
+                "skipped_errors": self.skipped_errors,
+                "in_flight": self._in_flight,
+                "cache_entries": len(self._scores),
+                "cache_hit_rate": round(self.cache_hits / lookups, 4) if lookups else None,
+                "latency_p50_ms": round(latencies[len(latencies) // 2], 1) if latencies else None,
+                "latency_p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1) if latencies else None,
+            }
@@ -1,10 +1,22 @@
+import json
 import logging
+import threading
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
+from langchain_core.documents import Document
 
+from app.core.config import settings
+from app.core.memory import memory_registry
 from app.core.database import SessionLocal
 from app.models import database_models as models
-from app.rag.embedder import initialize_vector_db
+from app.models.order_summary import get_summaries
+from app.rag.embedder import close_vector_db, initialize_vector_db, vector_db_identifier
+from app.rag.index_versions import active_version, version_path
+from app.rag.normalization import normalize_query
+from app.rag.quantization import BinaryQuantizedIndex, get_shared_index, rescore, set_shared_index
+from app.rag.query_cache import get_query_cache
+from app.rag.reranker import CrossEncoderReranker
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -12,25 +24,265 @@ logger = logging.getLogger(__name__)
 
 class RAGRetriever:
     def __init__(self):
-        self.vector_db = initialize_vector_db()
+        self.version = active_version()
+        self.vector_db = initialize_vector_db(version_path(self.version))
+        self.binary_index: Optional[BinaryQuantizedIndex] = None
+        self._dimensions: Optional[int] = None
+        # Set when the memory budget evicted the binary index: this worker then searches exactly
+        self._binary_evicted = False
+        self.reranker: Optional[CrossEncoderReranker] = CrossEncoderReranker() if settings.RERANK_ENABLED else None
+        # Searches in flight per store, and swapped-out stores waiting for theirs to finish
+        self._store_lock = threading.Lock()
+        self._store_users: Dict[int, int] = {}
+        self._retired: Dict[int, Any] = {}
+        
+        memory_registry.register("vector_index", self._vector_index_nbytes)
+        memory_registry.register("binary_index", self._binary_index_nbytes, evict=self._evict_binary_index)
+    
+    @contextmanager
+    def using_vector_db(self):
+        """Yield the current store, keeping it open until the caller is done even if it is swapped out meanwhile"""
+        with self._store_lock:
+            vector_db = self.vector_db
+            key = id(vector_db)
+            self._store_users[key] = self._store_users.get(key, 0) + 1
+        try:
+            yield vector_db
+        finally:
+            with self._store_lock:
+                self._store_users[key] -= 1
+                retired = None
+                if not self._store_users[key]:
+                    del self._store_users[key]
+                    retired = self._retired.pop(key, None)
+                    if retired is not None and self._path_in_use(retired):
+                        retired = None
+            if retired is not None:
+                close_vector_db(retired)
+    
+    def _path_in_use(self, vector_db) -> bool:
+        """Whether the live store or another retired one shares this store's directory (and so its Chroma system); call under _store_lock"""
+        identifier = vector_db_identifier(vector_db)
+        if identifier is None:
+            return False
+        stores = [self.vector_db] + [store for store in self._retired.values() if store is not vector_db]
+        return any(store is not None and vector_db_identifier(store) == identifier for store in stores)
+    
+    def path_in_use(self, path: str) -> bool:
+        """Whether the live store or a retired store still finishing searches lives in this directory"""
+        with self._store_lock:
+            stores = [self.vector_db] + list(self._retired.values())
+        return any(store is not None and vector_db_identifier(store) == path for store in stores)
+    
+    def _vector_index_nbytes(self) -> int:
+        """Rough size of the loaded HNSW index: float32 vectors plus 2*M neighbour links each"""
+        with self.using_vector_db() as vector_db:
+            if not vector_db:
+                return 0
+            collection = vector_db._collection
+            count = collection.count()
+            if not count:
+                return 0
+            if self._dimensions is None:
+                self._dimensions = len(collection.get(limit=1, include=["embeddings"])["embeddings"][0])
+            links = (collection.metadata or {}).get("hnsw:M", 16) * 2
+            return count * (self._dimensions * 4 + links * 4)
+    
+    def _binary_index_nbytes(self) -> int:
+        return self.binary_index.nbytes if self.binary_index is not None else 0
+    
+    def _evict_binary_index(self, target_bytes: int) -> int:
+        """Drop the binary index unless it fits the target, and search exactly from then on instead of rebuilding it"""
+        index = self.binary_index
+        if index is None or index.nbytes <= target_bytes:
+            return 0
+        # An index preloaded by the master stays referenced (and shared) there, dropping it frees nothing
+        if get_shared_index(self.vector_db._collection.name) is index:
+            return 0
+        self.binary_index = None
+        self._binary_evicted = True
+        logger.warning("Binary index evicted by the memory budget; this worker now uses exact vector search")
+        return index.nbytes
+    
+    def swap_vector_db(self, vector_db, version: str):
+        """Switch to another vector store version; in-flight searches finish on the old one, which is closed after them"""
+        with self._store_lock:
+            old = self.vector_db
+            self.vector_db = vector_db
+            self.version = version
+            self.binary_index = None
+            self._dimensions = None
+            close_now = old is not None and old is not vector_db and not self._store_users.get(id(old))
+            if old is not None and old is not vector_db and not close_now:
+                self._retired[id(old)] = old
+            # After a rollback to a version still open here the new store shares the old one's Chroma system
+            if close_now and self._path_in_use(old):
+                close_now = False
+        
+        if old is not None:
+            # The preloaded index belongs to the version the master process saw at startup
+            set_shared_index(old._collection.name, None)
+        if close_now:
+            close_vector_db(old)
+        logger.info(f"Retriever switched to vector store version {version}")
+    
+    def _search_mode(self, vector_db) -> str:
+        """Resolve the configured search mode for the store's collection"""
+        if self._binary_evicted:
+            return "exact"
+        
+        collection_name = vector_db._collection.name
+        
+        for entry in settings.VECTOR_SEARCH_MODES.split(","):
+            name, _, mode = entry.partition("=")
+            if name.strip() == collection_name and mode.strip():
+                return mode.strip()
+        
+        return settings.VECTOR_SEARCH_MODE
     
-    def retrieve_documents(self, query: str, k: int = 3) -> List[str]:
-        """Retrieve relevant document chunks from vector database"""
+    def _get_binary_index(self, vector_db) -> BinaryQuantizedIndex:
+        """Binary-quantized index of the given store, built on first use"""
+        with self._store_lock:
+            index = self.binary_index if self.vector_db is vector_db else None
+        if index is None:
+            # Prefer the index preloaded by the master process in multi-worker mode
+            index = get_shared_index(vector_db._collection.name) or BinaryQuantizedIndex.from_vector_db(vector_db)
+            # Do not cache an index built from a version that was swapped out meanwhile
+            with self._store_lock:
+                if self.vector_db is vector_db:
+                    self.binary_index = index
+        return index
+    
+    def refresh_binary_index(self):
+        """Drop the binary-quantized index so it is rebuilt from the collection on next use"""
+        self.binary_index = None
+    
+    def _binary_search(self, vector_db, index: BinaryQuantizedIndex, query_embedding: List[float], k: int,
+                       where: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Two-stage search: Hamming prefilter on sign bits, then exact rescoring (index must belong to vector_db)"""
+        # Restrict the Hamming scan to the rows matching the metadata filter, using the index's own columns
+        rows = index.filter_rows(where) if where else None
+        allowed_ids = None
+        if where and rows is None:
+            # The filter uses metadata the index does not keep: ask the store which rows match
+            allowed_ids = vector_db.get(where=where, include=[])["ids"]
+        candidates = index.search(query_embedding, k * settings.BINARY_RESCORE_FACTOR, allowed_ids=allowed_ids, rows=rows)
+        if not candidates:
+            return []
+        
+        # Fetch full-precision vectors for the candidates only
+        rows = vector_db.get(
+            ids=[candidate_id for candidate_id, _ in candidates],
+            include=["embeddings", "documents", "metadatas"]
+        )
+        if len(rows["ids"]) == 0:
+            return []
+        
+        space = (vector_db._collection.metadata or {}).get("hnsw:space", "l2")
+        distances = rescore(query_embedding, rows["embeddings"], space=space)
+        
+        return [
+            Document(page_content=rows["documents"][i], metadata=rows["metadatas"][i] or {})
+            for i in distances.argsort()[:k]
+        ]
+    
+    def _embed_queries(self, vector_db, queries: List[str]) -> List[List[float]]:
+        """Embed queries after normalization, encoding only those not in the query embedding cache"""
+        if settings.QUERY_NORMALIZATION:
+            queries = [normalize_query(query) for query in queries]
+        
+        cache = get_query_cache()
+        if cache is None:
+            return vector_db.embeddings.embed_documents(queries)
+        return cache.embed(queries, vector_db.embeddings.embed_documents)
+    
+    def _search(self, vector_db, query_embedding: List[float], k: int, search_mode: Optional[str],
+                where: Optional[Dict[str, Any]]) -> List[Document]:
+        if (search_mode or self._search_mode(vector_db)) == "binary" and not self._binary_evicted:
+            return self._binary_search(vector_db, self._get_binary_index(vector_db), query_embedding, k, where)
+        return vector_db.similarity_search_by_vector(query_embedding, k=k, filter=where)
+    
+    def retrieve_documents(self, query: str, k: int = 3, search_mode: Optional[str] = None,
+                           where: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Retrieve relevant document chunks from vector database, pre-filtered by metadata if given and optionally reranked"""
         if not self.vector_db:
             logger.warning("Vector database not initialized")
             return []
         
-        try:
-            # Search for similar documents
-            docs = self.vector_db.similarity_search(query, k=k)
-            
-            # Extract content from documents
-            content = [doc.page_content for doc in docs]
-            logger.info(f"Retrieved {len(content)} document chunks for query: {query}")
-            return content
-        except Exception as e:
-            logger.error(f"Error retrieving documents: {str(e)}")
-            return []
+        with self.using_vector_db() as vector_db:
+            try:
+                # Search for similar documents
+                query_embedding = self._embed_queries(vector_db, [query])[0]
+                # Over-fetch candidates for the cross-encoder when reranking is enabled
+                fetch_k = max(k, settings.RERANK_CANDIDATES) if self.reranker else k
+                docs = self._search(vector_db, query_embedding, fetch_k, search_mode, where)
+                if where and not docs:
+                    # Stores built before the metadata existed, or a filter nothing matches
+                    logger.info(f"No documents match filter {where}, searching all documents")
+                    docs = self._search(vector_db, query_embedding, fetch_k, search_mode, None)
+                
+                if self.reranker:
+                    docs = self.reranker.rerank(query, docs, k)
+                
+                # Extract content from documents
+                content = [doc.page_content for doc in docs]
+                logger.info(f"Retrieved {len(content)} document chunks for query: {query}")
+                return content
+            except Exception as e:
+                logger.error(f"Error retrieving documents: {str(e)}")
+                return []
+    
+    def _search_batch(self, vector_db, query_embeddings: List[List[float]], k: int,
+                      wheres: List[Optional[Dict[str, Any]]]) -> List[List[Document]]:
+        if self._search_mode(vector_db) == "binary":
+            index = self._get_binary_index(vector_db)
+            return [self._binary_search(vector_db, index, embedding, k, where)
+                    for embedding, where in zip(query_embeddings, wheres)]
+        
+        # One collection query per distinct filter in the batch
+        groups: Dict[str, List[int]] = {}
+        for i, where in enumerate(wheres):
+            groups.setdefault(json.dumps(where, sort_keys=True), []).append(i)
+        
+        results: List[List[Document]] = [[] for _ in query_embeddings]
+        for key, indices in groups.items():
+            found = vector_db._collection.query(
+                query_embeddings=[query_embeddings[i] for i in indices],
+                n_results=k,
+                where=json.loads(key),
+                include=["documents", "metadatas"]
+            )
+            for i, documents, metadatas in zip(indices, found["documents"], found["metadatas"]):
+                results[i] = [Document(page_content=document, metadata=metadata or {})
+                              for document, metadata in zip(documents, metadatas)]
+        return results
+    
+    def retrieve_documents_batch(self, queries: List[str], k: int = 3,
+                                 wheres: Optional[List[Optional[Dict[str, Any]]]] = None) -> List[List[str]]:
+        """Retrieve document chunks for many queries, embedding (and reranking) them in one batch"""
+        if not self.vector_db or not queries:
+            return [[] for _ in queries]
+        
+        wheres = wheres or [None] * len(queries)
+        with self.using_vector_db() as vector_db:
+            try:
+                query_embeddings = self._embed_queries(vector_db, queries)
+                fetch_k = max(k, settings.RERANK_CANDIDATES) if self.reranker else k
+                results = self._search_batch(vector_db, query_embeddings, fetch_k, wheres)
+                
+                # Queries whose filter matched nothing fall back to an unfiltered search
+                unmatched = [i for i, documents in enumerate(results) if wheres[i] and not documents]
+                if unmatched:
+                    fallback = self._search_batch(vector_db, [query_embeddings[i] for i in unmatched], fetch_k, [None] * len(unmatched))
+                    for i, documents in zip(unmatched, fallback):
+                        results[i] = documents
+                
+                if self.reranker:
+                    results = self.reranker.rerank_batch(queries, results, k)
+                return [[doc.page_content for doc in documents[:k]] for documents in results]
+            except Exception as e:
+                logger.error(f"Error retrieving documents for batch: {str(e)}")
+                return [[] for _ in queries]
     
     def retrieve_product_info(self, product_name: str = None, product_id: int = None) -> Optional[Dict[str, Any]]:
         """Retrieve product information from database"""
@@ -97,25 +349,100 @@ class RAGRetriever:
         finally:
             db.close()
     
-    def retrieve_customer_orders(self, customer_id: int) -> List[Dict[str, Any]]:
-        """Retrieve all orders for a specific customer"""
+    def retrieve_customer_orders(self, customer_id: int) -> Dict[str, Any]:
+        """Retrieve the order summary of a customer (counts by status, lifetime total, newest orders)"""
         db = SessionLocal()
         try:
-            orders = db.query(models.Pesanan).filter(models.Pesanan.pelanggan_id == customer_id).all()
+            return get_summaries(db.connection(), [customer_id]).get(customer_id, {})
+        except Exception as e:
+            logger.error(f"Error retrieving customer orders: {str(e)}")
+            return {}
+        finally:
+            db.close()
+    
+    def retrieve_products_bulk(self, product_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Retrieve many products by ID with a single IN (...) query"""
+        if not product_ids:
+            return {}
+        
+        db = SessionLocal()
+        try:
+            produk_list = db.query(models.Produk).filter(models.Produk.id.in_(set(product_ids))).all()
             
-            result = []
-            for order in orders:
-                result.append({
-                    "id": order.id,
-                    "tanggal_pesanan": order.tanggal_pesanan,
-                    "status": order.status,
-                    "total_harga": order.total_harga
+            return {
+                produk.id: {
+                    "id": produk.id,
+                    "nama": produk.nama,
+                    "deskripsi": produk.deskripsi,
+                    "kategori": produk.kategori,
+                    "harga": produk.harga,
+                    "stok": produk.stok
+                }
+                for produk in produk_list
+            }
+        except Exception as e:
+            logger.error(f"Error retrieving products in bulk: {str(e)}")
+            return {}
+        finally:
+            db.close()
+    
+    def retrieve_orders_bulk(self, order_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Retrieve many orders with their items using one IN (...) query per table"""
+        if not order_ids:
+            return {}
+        
+        db = SessionLocal()
+        try:
+            pesanan_list = db.query(models.Pesanan).filter(models.Pesanan.id.in_(set(order_ids))).all()
+            if not pesanan_list:
+                return {}
+            
+            items = db.query(models.PesananItem).filter(
+                models.PesananItem.pesanan_id.in_([pesanan.id for pesanan in pesanan_list])
+            ).all()
+            produk_names = dict(
+                db.query(models.Produk.id, models.Produk.nama)
+                .filter(models.Produk.id.in_({item.produk_id for item in items}))
+                .all()
+            ) if items else {}
+            
+            items_by_order: Dict[int, List[Dict[str, Any]]] = {}
+            for item in items:
+                items_by_order.setdefault(item.pesanan_id, []).append({
+                    "produk_nama": produk_names.get(item.produk_id, "Unknown"),
+                    "jumlah": item.jumlah,
+                    "harga_satuan": item.harga_satuan,
+                    "subtotal": item.subtotal
                 })
             
-            return result
+            return {
+                pesanan.id: {
+                    "id": pesanan.id,
+                    "pelanggan_id": pesanan.pelanggan_id,
+                    "tanggal_pesanan": pesanan.tanggal_pesanan,
+                    "status": pesanan.status,
+                    "total_harga": pesanan.total_harga,
+                    "items": items_by_order.get(pesanan.id, [])
+                }
+                for pesanan in pesanan_list
+            }
         except Exception as e:
-            logger.error(f"Error retrieving customer orders: {str(e)}")
-            return []
+            logger.error(f"Error retrieving orders in bulk: {str(e)}")
+            return {}
+        finally:
+            db.close()
+    
+    def retrieve_customer_orders_bulk(self, customer_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Retrieve the order summaries of many customers with a single IN (...) query"""
+        if not customer_ids:
+            return {}
+        
+        db = SessionLocal()
+        try:
+            return get_summaries(db.connection(), customer_ids)
+        except Exception as e:
+            logger.error(f"Error retrieving customer orders in bulk: {str(e)}")
+            return {}
         finally:
             db.close()
     
@@ -139,7 +466,8 @@ class RAGRetriever:
                 
                 if self.vector_db:
                     # Use vector search for relevance
-                    documents = self.vector_db.similarity_search(query, k=min(5, len(faqs)))
+                    with self.using_vector_db() as vector_db:
+                        documents = vector_db.similarity_search(query, k=min(5, len(faqs)))
                     
                     # Extract FAQ indices from document metadata (simplified)
                     # In a real implementation, you'd store FAQ IDs in document metadata
@@ -0,0 +1,163 @@
+import json
+import re
+import sys
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from app.core.config import settings
+from app.rag.normalization import normalize_query
+
+# Intents whose answer depends on who is asking; these are only shared between
+# concurrent requests of the same user
+USER_SCOPED_INTENTS = {"customer_orders", "order_status"}
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def flight_text(query: str) -> str:
+    """Form of a query used for coalescing: the embedding normalization without stemming"""
+    text = _WHITESPACE_PATTERN.sub(" ", query.strip().lower())
+    if settings.QUERY_NORMALIZATION:
+        # Queries of only emoji or fillers normalize to nothing; keep those apart
+        text = normalize_query(query, stem=False) or text
+    return text
+
+
+def flight_key(query: str, intent_data: Dict[str, Any], user_id: Optional[str] = None) -> Optional[str]:
+    """Key under which identical in-flight requests share one execution, or None if unshareable"""
+    intent = intent_data.get("intent", "general")
+    scope = ""
+    if intent in USER_SCOPED_INTENTS:
+        if not user_id:
+            return None
+        scope = user_id
+
+    entities = json.dumps(intent_data.get("entities") or {}, sort_keys=True, default=str)
+    return f"{scope}|{intent}|{entities}|{flight_text(query)}"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs a function once per key for all concurrent callers and shares its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[..., Any], *args) -> Tuple[Any, bool]:
+        """Return (result, shared); shared is True when another caller's execution was reused"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args)
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class TokenBroadcast:
+    """Buffers one token stream and replays it to any number of subscribers"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._tokens = []
+        self._finished = False
+        self._error: Optional[BaseException] = None
+
+    def publish(self, token: str):
+        with self._condition:
+            self._tokens.append(token)
+            self._condition.notify_all()
+
+    def close(self, error: Optional[BaseException] = None):
+        with self._condition:
+            self._finished = True
+            self._error = error
+            self._condition.notify_all()
+
+    def subscribe(self) -> Iterator[str]:
+        """Yield every token from the start of the stream, then new tokens as they arrive"""
+        position = 0
+        while True:
+            with self._condition:
+                while position >= len(self._tokens) and not self._finished:
+                    self._condition.wait()
+                pending = self._tokens[position:]
+                position = len(self._tokens)
+                finished, error = self._finished, self._error
+
+            yield from pending
+
+            if finished and position >= len(self._tokens):
+                if error is not None:
+                    raise error
+                return
+
+    @property
+    def nbytes(self) -> int:
+        return sum(sys.getsizeof(token) for token in self._tokens)
+
+
+class StreamFlight:
+    """Single-flight for token streams: one producer per key, fanned out to all subscribers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams: Dict[str, TokenBroadcast] = {}
+
+    def stream(self, key: str, producer: Callable[[], Iterator[str]]) -> Iterator[str]:
+        with self._lock:
+            broadcast = self._streams.get(key)
+            if broadcast is None:
+                broadcast = TokenBroadcast()
+                self._streams[key] = broadcast
+                # The producer runs on its own thread so a disconnecting subscriber never stalls the others
+                threading.Thread(target=self._pump, args=(key, broadcast, producer), daemon=True).start()
+
+        return broadcast.subscribe()
+
+    def _pump(self, key: str, broadcast: TokenBroadcast, producer: Callable[[], Iterator[str]]):
+        error = None
+        try:
+            for token in producer():
+                broadcast.publish(token)
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                self._streams.pop(key, None)
+            broadcast.close(error)
+
+    def in_flight(self) -> int:
+        return len(self._streams)
+
+    def nbytes(self) -> int:
+        """Bytes held by the tokens buffered for in-flight streams"""
+        with self._lock:
+            broadcasts = list(self._streams.values())
+        return sum(broadcast.nbytes for broadcast in broadcasts)
@@ -0,0 +1,121 @@
+"""Recall@k, memory and latency of binary-quantized two-stage search vs exact float32 search.
+
+Run with synthetic clustered vectors:
+    python -m benchmarks.binary_search --vectors 200000
+
+Or against the live Chroma collection (also times the real similarity_search):
+    python -m benchmarks.binary_search --from-vector-db
+"""
+import argparse
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from app.rag.quantization import BinaryQuantizedIndex, rescore
+
+
+def make_synthetic_corpus(n: int, dim: int, queries: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Clustered, unit-normalized vectors roughly shaped like sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(n // 50, 8), dim)).astype(np.float32)
+
+    corpus = centers[rng.integers(0, len(centers), n)] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+
+    picks = rng.integers(0, n, queries)
+    noise = rng.normal(size=(queries, dim)).astype(np.float32) / np.sqrt(dim)
+    query_vectors = corpus[picks] + 0.3 * noise
+    return corpus, query_vectors
+
+
+def load_vector_db_corpus(queries: int, seed: int):
+    """Pull every embedding from the live collection; queries are perturbed stored vectors"""
+    from app.rag.embedder import initialize_vector_db
+
+    vector_db = initialize_vector_db()
+    if vector_db is None:
+        raise SystemExit("Vector database is not available")
+
+    rows = vector_db.get(include=["embeddings"])
+    corpus = np.asarray(rows["embeddings"], dtype=np.float32)
+
+    rng = np.random.default_rng(seed)
+    query_vectors = corpus[rng.integers(0, len(corpus), queries)]
+    noise = rng.normal(size=query_vectors.shape).astype(np.float32) / np.sqrt(corpus.shape[1])
+    query_vectors = query_vectors + 0.3 * noise * np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return vector_db, corpus, query_vectors
+
+
+def exact_top_k(corpus: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    distances = rescore(query, corpus)
+    top = np.argpartition(distances, k - 1)[:k]
+    return top[np.argsort(distances[top])]
+
+
+def two_stage_top_k(index: BinaryQuantizedIndex, corpus: np.ndarray, query: np.ndarray, k: int, factor: int) -> np.ndarray:
+    candidates = np.array([int(i) for i, _ in index.search(query, k * factor)])
+    distances = rescore(query, corpus[candidates])
+    return candidates[np.argsort(distances)[:k]]
+
+
+def percentile_ms(samples: List[float], pct: float) -> float:
+    return float(np.percentile(samples, pct) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--factors", default="1,2,5,10,20")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--from-vector-db", action="store_true")
+    args = parser.parse_args()
+
+    vector_db = None
+    if args.from_vector_db:
+        vector_db, corpus, query_vectors = load_vector_db_corpus(args.queries, args.seed)
+    else:
+        corpus, query_vectors = make_synthetic_corpus(args.vectors, args.dim, args.queries, args.seed)
+
+    k = min(args.k, len(corpus))
+    index = BinaryQuantizedIndex.from_embeddings([str(i) for i in range(len(corpus))], corpus)
+
+    print(f"corpus: {len(corpus)} x {corpus.shape[1]}, queries: {len(query_vectors)}, k={k}")
+    print(f"memory  float32: {corpus.nbytes / 2**20:9.2f} MiB   binary codes: {index.nbytes / 2**20:9.2f} MiB "
+          f"({corpus.nbytes / max(index.nbytes, 1):.0f}x smaller)")
+
+    truth, exact_times = [], []
+    for query in query_vectors:
+        start = time.perf_counter()
+        truth.append(set(exact_top_k(corpus, query, k).tolist()))
+        exact_times.append(time.perf_counter() - start)
+
+    print(f"\n{'mode':<22}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    print(f"{'exact float32':<22}{1.0:>10.3f}{percentile_ms(exact_times, 50):>10.2f}{percentile_ms(exact_times, 95):>10.2f}")
+
+    for factor in [int(f) for f in args.factors.split(",")]:
+        hits, times = 0, []
+        for query, expected in zip(query_vectors, truth):
+            start = time.perf_counter()
+            found = two_stage_top_k(index, corpus, query, k, factor)
+            times.append(time.perf_counter() - start)
+            hits += len(expected.intersection(found.tolist()))
+        recall = hits / (k * len(query_vectors))
+        label = f"binary x{factor} rescore"
+        print(f"{label:<22}{recall:>10.3f}{percentile_ms(times, 50):>10.2f}{percentile_ms(times, 95):>10.2f}")
+
+    if vector_db is not None:
+        # End-to-end latency of the current similarity_search path for comparison
+        times = []
+        for query in query_vectors:
+            start = time.perf_counter()
+            vector_db.similarity_search_by_vector(query.tolist(), k=k)
+            times.append(time.perf_counter() - start)
+        print(f"{'chroma similarity':<22}{'-':>10}{percentile_ms(times, 50):>10.2f}{percentile_ms(times, 95):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Peak memory and chunks/sec of document chunking: legacy load-all pipeline vs streaming.
+
+    python -m benchmarks.chunking --documents-path /path/to/large/pdf/set
+
+Each pipeline runs in its own subprocess so peak RSS is measured independently.
+Also reports how many chunk tokens exceed the embedding model's 256 word-piece limit
+(those tokens are truncated and never embedded).
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+MODEL_MAX_TOKENS = 256
+
+
+def run_legacy(documents_path: str):
+    """The original pipeline: load every PDF page, then split by 1000 characters"""
+    from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    loader = DirectoryLoader(documents_path, glob="**/*.pdf", loader_cls=PyPDFLoader)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, length_function=len)
+    return splitter.split_documents(loader.load())
+
+
+def run_streaming(documents_path: str):
+    """The streaming pipeline: page by page, token-sized chunks"""
+    from app.rag.document_loader import DocumentProcessor
+
+    for chunk in DocumentProcessor(documents_path).iter_chunks():
+        yield chunk
+
+
+def measure(mode: str, documents_path: str) -> dict:
+    from app.rag.document_loader import get_tokenizer
+
+    tokenizer = get_tokenizer()
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    chunks = tokens = truncated = 0
+    for chunk in (run_legacy if mode == "legacy" else run_streaming)(documents_path):
+        chunks += 1
+        if tokenizer is not None:
+            count = len(tokenizer.encode(chunk.page_content))
+            tokens += count
+            truncated += max(count - MODEL_MAX_TOKENS, 0)
+
+    elapsed = time.perf_counter() - start
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "mode": mode,
+        "chunks": chunks,
+        "seconds": round(elapsed, 2),
+        "chunks_per_sec": round(chunks / elapsed, 1) if elapsed else 0.0,
+        "peak_python_mib": round(peak_traced / 2**20, 1),
+        "peak_rss_delta_mib": round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) / 1024, 1),
+        "truncated_token_pct": round(100 * truncated / tokens, 1) if tokens else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents-path", required=True)
+    parser.add_argument("--mode", choices=["legacy", "streaming"], help="run a single pipeline in-process")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.documents_path)))
+        return
+
+    print(f"{'mode':<11}{'chunks':>8}{'sec':>8}{'chunks/s':>10}{'peak py MiB':>13}{'peak RSS MiB':>14}{'truncated %':>13}")
+    for mode in ("legacy", "streaming"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.chunking", "--documents-path", args.documents_path, "--mode", mode],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{result['mode']:<11}{result['chunks']:>8}{result['seconds']:>8}{result['chunks_per_sec']:>10}"
+              f"{result['peak_python_mib']:>13}{result['peak_rss_delta_mib']:>14}{str(result['truncated_token_pct']):>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Index size and distinct results per query with and without near-duplicate removal.
+
+    python -m benchmarks.dedup --documents-path data/documents --k 3
+    python -m benchmarks.dedup --queries-file queries.txt   # one query per line
+
+Results are "distinct" when no two of them are near-duplicates of each other
+(estimated Jaccard below DEDUP_JACCARD_THRESHOLD).
+"""
+import argparse
+from typing import List
+
+import numpy as np
+
+from app.core.config import settings
+from app.rag.dedup import MinHasher, NearDuplicateFilter
+from app.rag.document_loader import DocumentProcessor
+
+DEFAULT_QUERIES = [
+    "Apa saja produk yang dijual oleh Rumah Kreatif Toba?",
+    "Berapa stok produk kain tenun yang tersedia?",
+    "Bagaimana cara memesan produk dari Rumah Kreatif Toba?",
+    "Berapa lama waktu pengiriman untuk wilayah Jakarta?",
+    "Apakah ada diskon untuk pembelian dalam jumlah besar?",
+    "Apa bahan dasar kerajinan tangan yang dijual?",
+]
+
+
+def distinct_count(texts: List[str], hasher: MinHasher, threshold: float) -> int:
+    """Number of results left after collapsing near-duplicates among them"""
+    signatures = [hasher.signature(text) for text in texts]
+    groups: List[np.ndarray] = []
+    for signature in signatures:
+        if not any(np.mean(signature == other) >= threshold for other in groups):
+            groups.append(signature)
+    return len(groups)
+
+
+def evaluate(texts: List[str], queries: List[str], k: int, hasher: MinHasher, threshold: float) -> float:
+    from app.rag.embedder import get_embeddings
+
+    embeddings = get_embeddings()
+    corpus = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    distinct = []
+    for query in queries:
+        vector = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+        top = np.argsort(((corpus - vector) ** 2).sum(axis=1))[:k]
+        distinct.append(distinct_count([texts[i] for i in top], hasher, threshold))
+    return float(np.mean(distinct))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents-path", default=settings.DOCUMENTS_PATH)
+    parser.add_argument("--queries-file")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=settings.DEDUP_JACCARD_THRESHOLD)
+    parser.add_argument("--skip-retrieval", action="store_true", help="only report index size")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    chunks = list(DocumentProcessor(args.documents_path).iter_chunks())
+    dedup = NearDuplicateFilter(threshold=args.threshold)
+    kept = list(dedup.filter(chunks))
+
+    original_bytes = sum(len(chunk.page_content.encode("utf-8")) for chunk in chunks)
+    kept_bytes = sum(len(chunk.page_content.encode("utf-8")) for chunk in kept)
+    print(dedup.report())
+    print(f"vectors: {len(chunks)} -> {len(kept)}, text bytes: {original_bytes} -> {kept_bytes}")
+
+    if args.skip_retrieval or not chunks:
+        return
+
+    before = evaluate([chunk.page_content for chunk in chunks], queries, args.k, dedup.hasher, args.threshold)
+    after = evaluate([chunk.page_content for chunk in kept], queries, args.k, dedup.hasher, args.threshold)
+    print(f"distinct results in top-{args.k} per query: {before:.2f} -> {after:.2f}")
+
+
+if __name__ == "__main__":
+    main()
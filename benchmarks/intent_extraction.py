@@ -0,0 +1,97 @@
+"""Tokens generated, latency, parse failures and accuracy of LLM intent extraction per output mode.
+
+    python -m benchmarks.intent_extraction
+    python -m benchmarks.intent_extraction --modes free,schema --model qwen2.5:0.5b
+    python -m benchmarks.intent_extraction --queries-file labeled.tsv   # "intent<TAB>query" per line
+
+"free" is the original unconstrained prompt; "json" and "schema" are the constrained
+modes (see app/rag/intent.py). Needs a running Ollama at OLLAMA_BASE_URL.
+"""
+import argparse
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+import requests
+
+from app.core.config import settings
+from app.rag.intent import IntentMetrics, build_intent_options, build_intent_prompt, parse_intent
+
+DEFAULT_QUERIES = [
+    ("produk_info", "Apa saja produk yang dijual oleh Rumah Kreatif Toba?"),
+    ("produk_info", "Berapa harga ulos kategori tenun?"),
+    ("stok_check", "Berapa stok produk 12 yang tersedia?"),
+    ("stok_check", "Apakah kain tenun masih ada stoknya?"),
+    ("order_status", "Bagaimana status pesanan 1045?"),
+    ("order_status", "Pesanan saya nomor 88 sudah dikirim belum?"),
+    ("customer_orders", "Tampilkan semua pesanan pelanggan 7"),
+    ("faq", "Bagaimana cara memesan produk dari Rumah Kreatif Toba?"),
+    ("faq", "Berapa lama waktu pengiriman untuk wilayah Jakarta?"),
+    ("general", "Halo, selamat pagi"),
+]
+
+
+def run_mode(mode: str, queries: List[Tuple[str, str]], model: str, base_url: str,
+             num_predict: int, repeat: int) -> Dict[str, Any]:
+    metrics = IntentMetrics()
+    tokens: List[int] = []
+    correct = 0
+
+    for _ in range(repeat):
+        for expected, query in queries:
+            payload = {
+                "model": model,
+                "prompt": build_intent_prompt(query, mode),
+                "stream": False,
+                **build_intent_options(mode, num_predict),
+            }
+            start = time.perf_counter()
+            try:
+                response = requests.post(f"{base_url}/api/generate", json=payload, timeout=120)
+                response.raise_for_status()
+                result = response.json()
+            except requests.exceptions.RequestException as e:
+                print(f"  request failed ({mode}): {e}")
+                metrics.record((time.perf_counter() - start) * 1000, 0, parsed=False, request_failed=True)
+                continue
+
+            intent_data = parse_intent(result.get("response", ""), mode)
+            eval_count = result.get("eval_count", 0)
+            metrics.record((time.perf_counter() - start) * 1000, eval_count, parsed=intent_data is not None)
+            tokens.append(eval_count)
+            if intent_data and intent_data["intent"] == expected:
+                correct += 1
+
+    report = metrics.report()
+    report["max_eval_tokens"] = max(tokens) if tokens else 0
+    report["median_eval_tokens"] = statistics.median(tokens) if tokens else 0
+    report["accuracy"] = round(correct / (len(queries) * repeat), 3)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="free,json,schema")
+    parser.add_argument("--model", default=settings.INTENT_MODEL or settings.OLLAMA_MODEL)
+    parser.add_argument("--base-url", default=settings.OLLAMA_BASE_URL)
+    parser.add_argument("--num-predict", type=int, default=settings.INTENT_NUM_PREDICT)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--queries-file")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            queries = [tuple(line.rstrip("\n").split("\t", 1)) for line in f if "\t" in line]
+
+    print(f"model {args.model}, {len(queries)} queries x {args.repeat}")
+    print(f"{'mode':<8}{'p50 ms':>9}{'p95 ms':>9}{'tokens':>8}{'max':>6}{'parse fail':>12}{'accuracy':>10}")
+    for mode in args.modes.split(","):
+        report = run_mode(mode.strip(), queries, args.model, args.base_url, args.num_predict, args.repeat)
+        print(f"{mode:<8}{report['latency_p50_ms'] or 0:>9.0f}{report['latency_p95_ms'] or 0:>9.0f}"
+              f"{report['mean_eval_tokens']:>8.1f}{report['max_eval_tokens']:>6}"
+              f"{report['parse_failure_rate']:>12.1%}{report['accuracy']:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Query embedding cache hit rate with and without query normalization.
+
+Replays a query stream through an LRU of --capacity entries keyed by the raw text, the
+lowercased text and the normalized text (app/rag/normalization.py), and reports the hit
+rate of each. Without --queries-file the stream is synthetic: popular customer questions
+(Zipf-distributed) written with the case, punctuation, emoji, slang and forms of address
+seen in chat. With --embed the normalized stream also goes through the real
+QueryEmbeddingCache and embedding model to measure per-query latency, cold and warm.
+
+    python -m benchmarks.query_cache
+    python -m benchmarks.query_cache --queries-file chat_log.txt --capacity 5000
+    python -m benchmarks.query_cache --embed --stream 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List
+
+from app.rag.normalization import StemmerFactory, normalize_query
+
+SEED_QUERIES = [
+    "berapa harga ulos tenun",
+    "apakah kain tenun masih ada stoknya",
+    "bagaimana cara memesan produk",
+    "berapa lama pengiriman ke jakarta",
+    "pesanan saya sudah dikirim belum",
+    "apakah bisa bayar di tempat",
+    "berapa ongkos kirim ke medan",
+    "produk apa saja yang dijual",
+    "apakah ada diskon untuk pembelian banyak",
+    "bagaimana cara retur barang yang rusak",
+    "kenapa pesanan saya belum sampai",
+    "apakah kopi sidikalang tersedia",
+    "berapa harga anyaman pandan",
+    "bagaimana cara pembayaran transfer",
+    "kapan toko buka",
+]
+
+# Abbreviations customers use for the words above
+ABBREVIATIONS = {
+    "berapa": ["brp", "brapa"], "tidak": ["gk", "gak", "tdk"], "sudah": ["udh", "sdh", "udah"],
+    "belum": ["blm", "belom"], "bagaimana": ["gmn", "gimana"], "yang": ["yg"], "untuk": ["utk"],
+    "bisa": ["bs"], "harga": ["hrg"], "kenapa": ["knp"], "kapan": ["kpn"], "pesanan": ["pesenan"],
+    "barang": ["brg"], "saya": ["sy", "aku"], "ongkos kirim": ["ongkir"], "bayar di tempat": ["cod"],
+}
+PREFIXES = ["", "", "kak ", "min ", "halo kak ", "gan "]
+SUFFIXES = ["", "?", "??", " dong", " ya kak", " 🙏", "? 😊", "!!", " kak?"]
+
+
+def variant(rng: random.Random, query: str) -> str:
+    """One way a customer might type the query"""
+    for word, abbreviations in ABBREVIATIONS.items():
+        if word in query and rng.random() < 0.5:
+            query = query.replace(word, rng.choice(abbreviations))
+    query = rng.choice(PREFIXES) + query + rng.choice(SUFFIXES)
+    casing = rng.random()
+    if casing < 0.3:
+        query = query.capitalize()
+    elif casing < 0.4:
+        query = query.upper()
+    return query
+
+
+def synthetic_stream(size: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    # Zipf-like popularity: the first questions are asked far more often
+    weights = [1 / (rank + 1) for rank in range(len(SEED_QUERIES))]
+    return [variant(rng, rng.choices(SEED_QUERIES, weights)[0]) for _ in range(size)]
+
+
+def hit_rate(stream: List[str], key: Callable[[str], str], capacity: int) -> Dict[str, float]:
+    cache: "OrderedDict[str, None]" = OrderedDict()
+    hits = 0
+    for query in stream:
+        cache_key = key(query)
+        if cache_key in cache:
+            hits += 1
+            cache.move_to_end(cache_key)
+        else:
+            cache[cache_key] = None
+            if len(cache) > capacity:
+                cache.popitem(last=False)
+    return {"hit_rate": hits / len(stream), "distinct": len({key(query) for query in stream})}
+
+
+def embed_latency(stream: List[str]) -> None:
+    from app.rag.embedder import get_embeddings
+    from app.rag.query_cache import QueryEmbeddingCache
+
+    embed_documents = get_embeddings().embed_documents
+    normalized = [normalize_query(query) for query in stream]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "query_cache.sqlite3")
+        for label, memory_entries in (("cold, disk + memory", 1024), ("restart, disk only", 0)):
+            cache = QueryEmbeddingCache(path=path, max_entries=len(stream), memory_entries=memory_entries)
+            timings = []
+            for query in normalized:
+                start = time.perf_counter()
+                cache.embed([query], embed_documents)
+                timings.append((time.perf_counter() - start) * 1000)
+            stats = cache.stats()
+            print(f"{label:<22} hit rate {stats['hit_rate']:.1%}, median {statistics.median(timings):.2f} ms, "
+                  f"mean {statistics.mean(timings):.2f} ms")
+
+    timings = []
+    for query in normalized[:200]:
+        start = time.perf_counter()
+        embed_documents([query])
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"{'uncached encode':<22} median {statistics.median(timings):.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stream", type=int, default=10000, help="synthetic queries to replay")
+    parser.add_argument("--capacity", type=int, default=1024, help="LRU entries")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--queries-file", help="one query per line, in arrival order")
+    parser.add_argument("--embed", action="store_true", help="also time the real cache and embedding model")
+    args = parser.parse_args()
+
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            stream = [line.strip() for line in f if line.strip()]
+    else:
+        stream = synthetic_stream(args.stream, args.seed)
+
+    keys = [
+        ("raw", lambda query: query),
+        ("lowercase + strip", lambda query: query.strip().lower()),
+        ("normalized", lambda query: normalize_query(query, stem=False)),
+    ]
+    if StemmerFactory is not None:
+        keys.append(("normalized + stemmed", lambda query: normalize_query(query, stem=True)))
+
+    print(f"{len(stream)} queries, LRU capacity {args.capacity}")
+    print(f"{'key':<22}{'distinct':>10}{'hit rate':>10}")
+    for name, key in keys:
+        result = hit_rate(stream, key, args.capacity)
+        print(f"{name:<22}{result['distinct']:>10}{result['hit_rate']:>10.1%}")
+
+    if args.embed:
+        embed_latency(stream)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""EXPLAIN plans and timings for the order, product and FAQ query paths (PostgreSQL).
+
+The queries are built with the same ORM expressions as the retriever and API routes.
+Parameters are picked from the data (the customer with the most orders, a typical
+customer, an order in the middle of the table), so run it after loading volume with
+benchmarks.synthetic_data.
+
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --compare          # also without the query indexes
+    python -m benchmarks.query_plans --json plans.json  # full EXPLAIN output
+
+--compare drops the secondary indexes inside a transaction that is rolled back
+afterwards; DROP INDEX locks the tables meanwhile, so only use it on a benchmark database.
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.models import database_models as models
+
+
+def query_indexes() -> List[str]:
+    """Secondary indexes declared on the models (everything except the primary key ones)"""
+    names = []
+    for model in (models.Produk, models.Pelanggan, models.Pesanan, models.PesananItem, models.FAQ):
+        for index in model.__table__.indexes:
+            columns = list(index.columns)
+            if not (len(columns) == 1 and columns[0].primary_key):
+                names.append(index.name)
+    return sorted(names)
+
+
+def benchmark_queries(db: Session) -> List[Tuple[str, Any]]:
+    heavy_customer = (db.query(models.Pesanan.pelanggan_id)
+                      .group_by(models.Pesanan.pelanggan_id)
+                      .order_by(func.count().desc()).limit(1).scalar()) or 1
+    customer_count = db.query(func.max(models.Pelanggan.id)).scalar() or 1
+    typical_customer = max(customer_count // 2, 1)
+    order_id = max((db.query(func.max(models.Pesanan.id)).scalar() or 1) // 2, 1)
+    kategori = db.query(models.Produk.kategori).limit(1).scalar() or ""
+    faq_kategori = db.query(models.FAQ.kategori).filter(models.FAQ.kategori.isnot(None)).limit(1).scalar() or ""
+
+    return [
+        ("retrieve_customer_orders (summary row)",
+         db.query(models.RingkasanPesanan).filter(models.RingkasanPesanan.pelanggan_id == heavy_customer)),
+        ("order summary refresh, newest orders",
+         db.query(models.Pesanan).filter(models.Pesanan.pelanggan_id == heavy_customer)
+         .order_by(models.Pesanan.id.desc()).limit(5)),
+        ("GET /pelanggan/{id}/pesanan?detail=true",
+         db.query(models.Pesanan).filter(models.Pesanan.pelanggan_id == typical_customer)
+         .order_by(models.Pesanan.id.desc()).limit(50)),
+        ("GET /pelanggan/{id}/pesanan?status=pending",
+         db.query(models.Pesanan).filter(models.Pesanan.pelanggan_id == heavy_customer,
+                                         models.Pesanan.status == "pending")),
+        ("retrieve_order_info items",
+         db.query(models.PesananItem).filter(models.PesananItem.pesanan_id == order_id)),
+        ("retrieve_orders_bulk items (64 orders)",
+         db.query(models.PesananItem).filter(models.PesananItem.pesanan_id.in_(range(order_id, order_id + 64)))),
+        ("GET /produk?kategori= (first page)",
+         db.query(models.Produk.id, models.Produk.nama, models.Produk.harga)
+         .filter(models.Produk.kategori == kategori).order_by(models.Produk.id).limit(100)),
+        ("GET /produk ETag",
+         db.query(func.max(models.Produk.updated_at), func.count(models.Produk.id))),
+        ("GET /faq?kategori= (first page)",
+         db.query(models.FAQ).filter(models.FAQ.aktif == True, models.FAQ.kategori == faq_kategori)
+         .order_by(models.FAQ.id).limit(100)),
+    ]
+
+
+def compile_sql(query) -> str:
+    return str(query.statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def explain(db: Session, sql: str, analyze: bool) -> Dict[str, Any]:
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    result = db.execute(text(f"EXPLAIN ({options}) {sql}")).scalar()
+    return (json.loads(result) if isinstance(result, str) else result)[0]
+
+
+def summarize(explained: Dict[str, Any]) -> Dict[str, Any]:
+    nodes = list(plan_nodes(explained["Plan"]))
+    scans = [f"{node['Node Type']}({node.get('Index Name') or node.get('Relation Name')})"
+             for node in nodes if "Scan" in node["Node Type"]]
+    return {
+        "scans": scans,
+        "seq_scan": any(node["Node Type"] == "Seq Scan" for node in nodes),
+        "cost": explained["Plan"]["Total Cost"],
+        "planning_ms": explained.get("Planning Time"),
+        "execution_ms": explained.get("Execution Time"),
+        "buffers": explained["Plan"].get("Shared Hit Blocks", 0) + explained["Plan"].get("Shared Read Blocks", 0),
+    }
+
+
+def time_query(db: Session, sql: str, repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.execute(text(sql)).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+    }
+
+
+def run(db: Session, queries: List[Tuple[str, str]], analyze: bool, repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    for name, sql in queries:
+        explained = explain(db, sql, analyze)
+        result = {"query": name, "sql": sql, **summarize(explained), "plan": explained}
+        if repeat:
+            result.update(time_query(db, sql, repeat))
+        results.append(result)
+    return results
+
+
+def print_results(title: str, results: List[Dict[str, Any]]):
+    print(f"\n{title}")
+    print(f"{'query':<46}{'median ms':>11}{'p95 ms':>9}{'cost':>12}{'buffers':>9}  scans")
+    for result in results:
+        print(f"{result['query']:<46}{result.get('median_ms', '-'):>11}{result.get('p95_ms', '-'):>9}"
+              f"{result['cost']:>12.1f}{result['buffers']:>9}  {', '.join(result['scans'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="timed executions per query (0 to skip)")
+    parser.add_argument("--no-analyze", action="store_true", help="plans only, without executing them")
+    parser.add_argument("--compare", action="store_true", help="also run without the secondary indexes")
+    parser.add_argument("--json", help="write all results including full plans to this file")
+    parser.add_argument("--database-url", help="defaults to the app's DATABASE_URL")
+    args = parser.parse_args()
+
+    if args.database_url:
+        from sqlalchemy import create_engine
+        engine = create_engine(args.database_url)
+    else:
+        from app.core.database import engine
+
+    if engine.dialect.name != "postgresql":
+        parser.error("query plans are only supported on PostgreSQL")
+
+    output = {}
+    with Session(engine) as db:
+        queries = [(name, compile_sql(query)) for name, query in benchmark_queries(db)]
+
+        if args.compare:
+            dropped = query_indexes()
+            for name in dropped:
+                db.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            output["without_indexes"] = run(db, queries, not args.no_analyze, args.repeat)
+            db.rollback()
+            print_results(f"Without indexes ({', '.join(dropped)})", output["without_indexes"])
+
+        output["with_indexes"] = run(db, queries, not args.no_analyze, args.repeat)
+        db.rollback()
+        print_results("With indexes", output["with_indexes"])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Retrieval latency and context size with and without cross-encoder reranking.
+
+Runs the same queries through RAGRetriever.retrieve_documents with the bi-encoder only
+and with the rerank stage (app/rag/reranker.py), and reports latency, chunks and
+characters handed to generation, rerank cache hit rate and how often the top chunk
+changed. Needs a built vector store.
+
+    python -m benchmarks.rerank
+    python -m benchmarks.rerank --k 5 --candidates 30 --repeat 3
+    python -m benchmarks.rerank --queries-file queries.txt   # one query per line
+"""
+import argparse
+import statistics
+import time
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.rag.reranker import CrossEncoderReranker
+from app.rag.retriever import RAGRetriever
+
+DEFAULT_QUERIES = [
+    "Apa saja produk yang dijual oleh Rumah Kreatif Toba?",
+    "Berapa harga ulos tenun?",
+    "Bagaimana cara memesan produk dari Rumah Kreatif Toba?",
+    "Berapa lama waktu pengiriman untuk wilayah Jakarta?",
+    "Apakah bisa membayar di tempat?",
+    "Bagaimana cara mengembalikan barang yang rusak?",
+    "Apa perbedaan ulos ragidup dan ulos sadum?",
+    "Apakah kopi dari Toba tersedia?",
+]
+
+
+def run(retriever: RAGRetriever, queries: List[str], k: int, repeat: int) -> Dict[str, Any]:
+    timings, chunks, characters, tops = [], [], [], []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            documents = retriever.retrieve_documents(query, k=k)
+            timings.append((time.perf_counter() - start) * 1000)
+            chunks.append(len(documents))
+            characters.append(sum(len(document) for document in documents))
+            tops.append(documents[0] if documents else None)
+    timings.sort()
+    return {
+        "median_ms": statistics.median(timings),
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "chunks": statistics.mean(chunks),
+        "characters": statistics.mean(characters),
+        "tops": tops,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--candidates", type=int, default=settings.RERANK_CANDIDATES)
+    parser.add_argument("--repeat", type=int, default=2, help="passes over the queries (later passes hit the caches)")
+    parser.add_argument("--queries-file")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    settings.RERANK_CANDIDATES = args.candidates
+    retriever = RAGRetriever()
+    if not retriever.vector_db:
+        parser.error("no vector store found; build it first")
+
+    retriever.reranker = None
+    baseline = run(retriever, queries, args.k, args.repeat)
+
+    retriever.reranker = CrossEncoderReranker()
+    retriever.reranker.model  # load outside the timed runs
+    reranked = run(retriever, queries, args.k, args.repeat)
+    metrics = retriever.reranker.metrics()
+
+    print(f"{len(queries)} queries x {args.repeat}, k={args.k}, candidates={args.candidates}, model {settings.RERANK_MODEL}")
+    print(f"{'stage':<12}{'median ms':>11}{'p95 ms':>9}{'chunks':>8}{'chars':>8}")
+    for name, result in (("bi-encoder", baseline), ("reranked", reranked)):
+        print(f"{name:<12}{result['median_ms']:>11.1f}{result['p95_ms']:>9.1f}"
+              f"{result['chunks']:>8.2f}{result['characters']:>8.0f}")
+    changed = sum(1 for before, after in zip(baseline["tops"], reranked["tops"]) if before != after)
+    print(f"top chunk changed for {changed / len(baseline['tops']):.0%} of queries; "
+          f"score cache hit rate {metrics['cache_hit_rate']}, expanded {metrics['expanded']}, "
+          f"skipped by latency guard {metrics['skipped_load']}")
+
+
+if __name__ == "__main__":
+    main()
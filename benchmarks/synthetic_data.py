@@ -0,0 +1,215 @@
+"""Deterministic synthetic data for scale testing the order, product and FAQ query paths.
+
+Rows are generated from a seeded RNG, so the same arguments always produce the same
+database. On PostgreSQL the rows are streamed with COPY; other databases fall back to
+executemany. Order volume per customer is skewed (a few customers have many orders)
+and statuses follow a realistic mix, so query plans see realistic selectivity.
+
+    python -m benchmarks.synthetic_data --orders 1000000 --truncate
+    python -m benchmarks.query_plans
+
+WARNING: --truncate deletes all rows of produk, pelanggan, pesanan, pesanan_item, faq and
+ringkasan_pesanan.
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Sequence, Tuple
+
+from sqlalchemy import text
+
+# Rows generated and written per COPY / executemany round trip
+CHUNK_ROWS = 50000
+
+PRODUK_KATEGORI = ["Ulos", "Tenun", "Anyaman", "Ukiran", "Kopi", "Makanan", "Aksesoris", "Pakaian"]
+FAQ_KATEGORI = ["Pemesanan", "Pembayaran", "Pengiriman", "Produk", "Retur"]
+# (status, weight): most orders are finished, a small active tail
+STATUS_WEIGHTS = [("selesai", 70), ("dikirim", 10), ("diproses", 8), ("pending", 10), ("dibatalkan", 2)]
+
+START_DATE = datetime(2022, 1, 1)
+
+COLUMNS = {
+    "produk": ["id", "nama", "deskripsi", "kategori", "harga", "stok", "gambar_url", "created_at", "updated_at"],
+    "pelanggan": ["id", "nama", "email", "telepon", "alamat", "created_at"],
+    "pesanan": ["id", "pelanggan_id", "tanggal_pesanan", "status", "total_harga", "alamat_pengiriman", "catatan"],
+    "pesanan_item": ["id", "pesanan_id", "produk_id", "jumlah", "harga_satuan", "subtotal"],
+    "faq": ["id", "pertanyaan", "jawaban", "kategori", "aktif", "created_at", "updated_at"],
+}
+
+
+def _timestamp(rng: random.Random, days: int = 1000) -> datetime:
+    return START_DATE + timedelta(seconds=rng.randrange(days * 86400))
+
+
+def generate_produk(rng: random.Random, count: int) -> Iterator[Tuple]:
+    for i in range(1, count + 1):
+        kategori = rng.choice(PRODUK_KATEGORI)
+        created = _timestamp(rng)
+        yield (i, f"{kategori} Toba {i}", f"{kategori} buatan pengrajin Toba, motif nomor {i}.", kategori,
+               float(rng.randrange(25, 2500) * 1000), rng.randrange(0, 200), None,
+               created, created + timedelta(days=rng.randrange(0, 60)))
+
+
+def generate_pelanggan(rng: random.Random, count: int) -> Iterator[Tuple]:
+    for i in range(1, count + 1):
+        yield (i, f"Pelanggan {i}", f"pelanggan{i}@example.com", f"08{rng.randrange(10 ** 9, 10 ** 10)}",
+               f"Jl. Sisingamangaraja No. {rng.randrange(1, 300)}, Balige", _timestamp(rng))
+
+
+def generate_orders(rng: random.Random, orders: int, customers: int, products: int,
+                    max_items: int) -> Iterator[Tuple[Tuple, List[Tuple]]]:
+    """Yield (pesanan row, its pesanan_item rows); item ids are assigned consecutively"""
+    statuses = [status for status, _ in STATUS_WEIGHTS]
+    weights = [weight for _, weight in STATUS_WEIGHTS]
+    item_id = 0
+    for i in range(1, orders + 1):
+        # Squaring a uniform draw skews volume toward low customer ids (heavy buyers)
+        pelanggan_id = 1 + int(customers * rng.random() ** 2)
+        items = []
+        total = 0.0
+        for _ in range(rng.randint(1, max_items)):
+            item_id += 1
+            jumlah = rng.randint(1, 5)
+            harga = float(rng.randrange(25, 2500) * 1000)
+            items.append((item_id, i, rng.randint(1, products), jumlah, harga, harga * jumlah))
+            total += harga * jumlah
+        yield ((i, min(pelanggan_id, customers), _timestamp(rng), rng.choices(statuses, weights)[0], total,
+                "Balige, Toba", None), items)
+
+
+def generate_faq(rng: random.Random, count: int) -> Iterator[Tuple]:
+    for i in range(1, count + 1):
+        kategori = rng.choice(FAQ_KATEGORI)
+        created = _timestamp(rng)
+        yield (i, f"Pertanyaan {kategori.lower()} nomor {i}?", f"Jawaban untuk pertanyaan {i}.", kategori,
+               rng.random() < 0.9, created, created)
+
+
+class BulkWriter:
+    """Writes rows with COPY on PostgreSQL and executemany elsewhere"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.postgres = engine.dialect.name == "postgresql"
+
+    def write(self, table: str, rows: Sequence[Tuple]):
+        if not rows:
+            return
+        columns = COLUMNS[table]
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            if self.postgres:
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in rows:
+                    writer.writerow("" if value is None else value for value in row)
+                buffer.seek(0)
+                # Empty unquoted fields are NULL in CSV COPY
+                cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            else:
+                placeholders = ", ".join("?" for _ in columns)
+                cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+            connection.commit()
+        finally:
+            connection.close()
+
+    def write_all(self, table: str, rows: Iterator[Tuple]) -> int:
+        count = 0
+        chunk: List[Tuple] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= CHUNK_ROWS:
+                self.write(table, chunk)
+                count += len(chunk)
+                chunk = []
+        self.write(table, chunk)
+        return count + len(chunk)
+
+
+def load(engine, customers: int, orders: int, products: int, faqs: int, max_items: int, seed: int, truncate: bool):
+    if truncate:
+        with engine.begin() as connection:
+            if engine.dialect.name == "postgresql":
+                connection.execute(text("TRUNCATE ringkasan_pesanan, pesanan_item, pesanan, pelanggan, produk, faq RESTART IDENTITY"))
+            else:
+                for table in ("ringkasan_pesanan", "pesanan_item", "pesanan", "pelanggan", "produk", "faq"):
+                    connection.execute(text(f"DELETE FROM {table}"))
+
+    writer = BulkWriter(engine)
+    rng = random.Random(seed)
+
+    for table, rows in (("produk", generate_produk(rng, products)),
+                        ("pelanggan", generate_pelanggan(rng, customers)),
+                        ("faq", generate_faq(rng, faqs))):
+        start = time.perf_counter()
+        count = writer.write_all(table, rows)
+        print(f"{table}: {count} rows in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    order_count = item_count = 0
+    order_chunk: List[Tuple] = []
+    item_chunk: List[Tuple] = []
+    for order, items in generate_orders(rng, orders, customers, products, max_items):
+        order_chunk.append(order)
+        item_chunk.extend(items)
+        if len(order_chunk) >= CHUNK_ROWS:
+            writer.write("pesanan", order_chunk)
+            writer.write("pesanan_item", item_chunk)
+            order_count += len(order_chunk)
+            item_count += len(item_chunk)
+            order_chunk, item_chunk = [], []
+    writer.write("pesanan", order_chunk)
+    writer.write("pesanan_item", item_chunk)
+    order_count += len(order_chunk)
+    item_count += len(item_chunk)
+    print(f"pesanan: {order_count} rows, pesanan_item: {item_count} rows in {time.perf_counter() - start:.1f}s")
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as connection:
+            # Explicit ids were loaded; move the sequences past them, then refresh planner statistics
+            for table in COLUMNS:
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+                ))
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            for table in COLUMNS:
+                connection.execute(text(f"ANALYZE {table}"))
+
+    # COPY bypasses the ORM events that keep the order summaries current
+    from app.models.order_summary import backfill_summaries
+    start = time.perf_counter()
+    summaries = backfill_summaries(engine)
+    print(f"ringkasan_pesanan: {summaries} rows in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=100000)
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--faqs", type=int, default=500)
+    parser.add_argument("--max-items", type=int, default=4, help="items per order are uniform in 1..max")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="delete existing rows first")
+    parser.add_argument("--database-url", help="defaults to the app's DATABASE_URL")
+    args = parser.parse_args()
+
+    from app.core.database import Base
+    from app.models import database_models  # noqa: F401  (registers tables on Base)
+
+    if args.database_url:
+        from sqlalchemy import create_engine
+        engine = create_engine(args.database_url)
+    else:
+        from app.core.database import engine
+
+    Base.metadata.create_all(bind=engine)
+    load(engine, args.customers, args.orders, args.products, args.faqs, args.max_items, args.seed, args.truncate)
+
+
+if __name__ == "__main__":
+    main()
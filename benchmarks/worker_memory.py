@@ -0,0 +1,68 @@
+"""Per-worker memory of a running gunicorn master and its workers (Linux only).
+
+RSS counts shared pages once per process; PSS divides them among the processes
+sharing them, so sum(RSS) - sum(PSS) is the memory saved by copy-on-write sharing.
+
+    gunicorn -c gunicorn.conf.py main:app --pid /tmp/gunicorn.pid
+    python -m benchmarks.worker_memory --pid $(cat /tmp/gunicorn.pid)
+
+Run once with the default preload config, then once more as the baseline with
+`--no-preload`. Without preload the master skips preload_shared_state(), so each worker
+loads its own embedding model, rerank model and binary index:
+
+    gunicorn -c gunicorn.conf.py main:app --pid /tmp/gunicorn.pid --no-preload
+    python -m benchmarks.worker_memory --pid $(cat /tmp/gunicorn.pid)
+
+Wait until every worker reports ready (GET /readyz) before measuring, since workers
+load in the background.
+"""
+import argparse
+import os
+from typing import Dict, List
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def read_smaps_rollup(pid: int) -> Dict[str, int]:
+    """Memory counters in KiB from /proc/<pid>/smaps_rollup"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(":") in FIELDS:
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return values
+
+
+def child_pids(pid: int) -> List[int]:
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(child) for child in f.read().split())
+    return children
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pid", type=int, required=True, help="gunicorn master pid")
+    args = parser.parse_args()
+
+    processes = [("master", args.pid)] + [("worker", pid) for pid in child_pids(args.pid)]
+
+    print(f"{'role':<8}{'pid':>8}{'RSS MiB':>10}{'PSS MiB':>10}{'shared MiB':>12}{'private MiB':>13}")
+    totals = {"Rss": 0, "Pss": 0}
+    for role, pid in processes:
+        mem = read_smaps_rollup(pid)
+        shared = mem.get("Shared_Clean", 0) + mem.get("Shared_Dirty", 0)
+        private = mem.get("Private_Clean", 0) + mem.get("Private_Dirty", 0)
+        totals["Rss"] += mem.get("Rss", 0)
+        totals["Pss"] += mem.get("Pss", 0)
+        print(f"{role:<8}{pid:>8}{mem.get('Rss', 0) / 1024:>10.1f}{mem.get('Pss', 0) / 1024:>10.1f}"
+              f"{shared / 1024:>12.1f}{private / 1024:>13.1f}")
+
+    print(f"\nsum RSS: {totals['Rss'] / 1024:.1f} MiB, sum PSS (actual): {totals['Pss'] / 1024:.1f} MiB, "
+          f"saved by sharing: {(totals['Rss'] - totals['Pss']) / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Production launch mode: one master preloads shared state, N uvicorn workers fork from it.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Graceful restart of all workers (zero downtime):  kill -HUP <master pid>
+Change worker count at runtime:                   kill -TTIN / -TTOU <master pid>
+"""
+import logging
+
+from app.core.config import settings
+
+bind = f"{settings.API_HOST}:{settings.API_PORT}"
+workers = settings.API_WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app in the master so forked workers share its memory copy-on-write
+preload_app = True
+
+# Workers finish in-flight requests for up to this long on restart/shutdown
+graceful_timeout = settings.API_GRACEFUL_TIMEOUT
+timeout = 120
+
+# Recycle workers periodically (staggered by the jitter) to bound memory growth
+max_requests = settings.API_MAX_REQUESTS
+max_requests_jitter = max(settings.API_MAX_REQUESTS // 10, 1)
+
+logger = logging.getLogger("gunicorn.error")
+
+
+def on_starting(server):
+    # With --no-preload every worker loads its own copy (the baseline for benchmarks.worker_memory)
+    if not server.cfg.preload_app:
+        logger.info("preload_app is off, workers load models and indexes themselves")
+        return
+
+    from app.core.preload import preload_shared_state
+
+    preload_shared_state()
+
+
+def post_fork(server, worker):
+    logger.info(f"Worker {worker.pid} forked from master {server.pid}")
@@ -1,16 +1,24 @@
-import uvicorn
-import logging
-from fastapi import FastAPI, Request, Depends, BackgroundTasks
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import Optional
+from app.core.startup import components, startup_profile, start_background_initialization
+
+with startup_profile.timed("import:fastapi"):
+    import uvicorn
+    import json
+    import logging
+    import os
+    import re
+    import tempfile
+    from fastapi import FastAPI, Request, Depends, BackgroundTasks
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+    from pydantic import BaseModel
+    from typing import Optional
 
 from app.core.config import settings
-from app.core.database import Base, engine
-from app.api.routes import router as api_router
-from app.rag.generator import ResponseGenerator
-from app.rag.embedder import initialize_vector_db
+
+with startup_profile.timed("import:app.api.routes"):
+    from app.api.routes import router as api_router
+    from app.api.admin import router as admin_router
 
 # Configure logging
 logging.basicConfig(
@@ -23,9 +31,6 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 # Initialize FastAPI app
 app = FastAPI(
     title="Rumah Kreatif Toba Chatbot API",
@@ -40,10 +45,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read the pagination cursor and cache validator
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include API router
 app.include_router(api_router, prefix="/api")
+app.include_router(admin_router, prefix="/api")
 
 class ChatRequest(BaseModel):
     message: str
@@ -52,27 +60,38 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
 
-# Initialize RAG components on startup
+# Heavy components (database schema, embedding model, vector store) are initialized
+# in the background so the server starts listening without waiting for them
 @app.on_event("startup")
 async def startup_event():
-    logger.info("Initializing vector database...")
-    initialize_vector_db()
+    start_background_initialization()
+    # Follow vector store versions activated by re-index jobs in other workers
+    from app.rag.reindex import reindex_manager
+    reindex_manager.start_watcher()
+    # Enforce MEMORY_BUDGET_MB / MEMORY_BUDGETS on the tracked models, indexes and caches
+    from app.core.memory import memory_registry
+    memory_registry.start_watcher()
+    startup_profile.mark("listening")
     logger.info("Application startup complete")
 
-# Initialize response generator
-response_generator = ResponseGenerator()
-
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     """
     Chat endpoint for the chatbot
     """
+    response_generator = components.get("response_generator")
+    if response_generator is None:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Chatbot sedang dipersiapkan, silakan coba lagi sebentar lagi"}
+        )
+    
     try:
         user_message = request.message
         logger.info(f"Received message: {user_message}")
         
         # Generate response
-        response = response_generator.generate_response(user_message)
+        response = await run_in_threadpool(response_generator.generate_response, user_message, request.user_id)
         
         return {"response": response}
     except Exception as e:
@@ -82,6 +101,115 @@ async def chat_endpoint(request: ChatRequest):
             content={"detail": "Internal server error"}
         )
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Chat endpoint that streams the response text as it is generated
+    """
+    response_generator = components.get("response_generator")
+    if response_generator is None:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Chatbot sedang dipersiapkan, silakan coba lagi sebentar lagi"}
+        )
+    
+    logger.info(f"Received streaming message: {request.message}")
+    return StreamingResponse(
+        response_generator.generate_response_stream(request.message, request.user_id),
+        media_type="text/plain; charset=utf-8"
+    )
+
+def _batch_output_path(job_id: str) -> str:
+    if not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", job_id):
+        raise ValueError("job_id hanya boleh berisi huruf, angka, '-' dan '_' (maksimal 64 karakter)")
+    return os.path.join(settings.BATCH_OUTPUT_PATH, f"{job_id}.jsonl")
+
+@app.post("/chat/batch")
+async def chat_batch_endpoint(request: Request, job_id: Optional[str] = None):
+    """
+    Batch chat endpoint: JSONL messages in, JSONL results streamed out as they complete.
+    With a job_id, results are also appended to a file and a repeated request with the
+    same job_id skips messages that were already answered.
+    """
+    response_generator = components.get("response_generator")
+    if response_generator is None:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Chatbot sedang dipersiapkan, silakan coba lagi sebentar lagi"}
+        )
+    
+    output_path = None
+    if job_id:
+        try:
+            output_path = _batch_output_path(job_id)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"detail": str(e)})
+    
+    # Spool the body to disk so thousands of messages are never held in memory
+    spool = tempfile.TemporaryFile(mode="w+b")
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+    
+    from app.rag.batch import BatchProcessor, read_completed_ids, read_messages
+    
+    def results():
+        skip_ids = read_completed_ids(output_path) if output_path else set()
+        sink = None
+        if output_path:
+            os.makedirs(settings.BATCH_OUTPUT_PATH, exist_ok=True)
+            sink = open(output_path, "a", encoding="utf-8")
+        try:
+            lines = (line.decode("utf-8", errors="replace") for line in spool)
+            for result in BatchProcessor(response_generator).process(read_messages(lines), skip_ids):
+                line = json.dumps(result, ensure_ascii=False, default=str) + "\n"
+                if sink:
+                    sink.write(line)
+                    sink.flush()
+                yield line
+        finally:
+            spool.close()
+            if sink:
+                sink.close()
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.get("/chat/batch/{job_id}")
+async def chat_batch_results(job_id: str):
+    """
+    Download all results written so far for a batch job
+    """
+    try:
+        output_path = _batch_output_path(job_id)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    
+    if not os.path.exists(output_path):
+        return JSONResponse(status_code=404, content={"detail": "Job batch tidak ditemukan"})
+    return FileResponse(output_path, media_type="application/x-ndjson")
+
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness probe: the process is up and serving requests
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness probe: all components are initialized, with the startup profile
+    """
+    ready = components.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "components": components.states(),
+            "startup_profile": startup_profile.report(),
+        }
+    )
+
 @app.get("/")
 async def root():
     """
@@ -97,5 +225,5 @@ if __name__ == "__main__":
         "main:app",
         host=settings.API_HOST,
         port=settings.API_PORT,
-        reload=True
+        reload=settings.API_RELOAD
     )
\ No newline at end of file
@@ -0,0 +1,24 @@
+-- Indexes for the order, product and FAQ query paths (see benchmarks/query_plans.py).
+-- Mirrors __table_args__ in app/models/database_models.py; new databases already get
+-- them from create_all, so every statement is a no-op there.
+-- Built CONCURRENTLY so existing tables stay writable while the indexes are created.
+
+-- retrieve_customer_orders, GET /api/pelanggan/{id}/pesanan[?status=]
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_pesanan_pelanggan_id_status ON pesanan (pelanggan_id, status);
+
+-- retrieve_order_info, retrieve_orders_bulk
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_pesanan_item_pesanan_id ON pesanan_item (pesanan_id);
+
+-- GET /api/produk?kategori= (ordered by id, keyset pagination)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_produk_kategori_id ON produk (kategori, id);
+
+-- max(updated_at) for catalogue ETags and the product re-index sync
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_produk_updated_at ON produk (updated_at);
+
+-- GET /api/faq?kategori=, retrieve_faq (active FAQs only)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_faq_kategori_id_aktif ON faq (kategori, id) WHERE aktif = true;
+
+ANALYZE pesanan;
+ANALYZE pesanan_item;
+ANALYZE produk;
+ANALYZE faq;
@@ -0,0 +1,21 @@
+-- Per-customer order summaries (RingkasanPesanan in app/models/database_models.py).
+-- create_all already creates the table on startup; this keeps the migration runnable on
+-- its own. Startup fills the table (app.models.order_summary.backfill_summaries) right
+-- after this file is applied.
+
+CREATE TABLE IF NOT EXISTS ringkasan_pesanan (
+    pelanggan_id INTEGER PRIMARY KEY REFERENCES pelanggan (id),
+    jumlah_pesanan INTEGER NOT NULL,
+    jumlah_per_status JSON NOT NULL,
+    total_belanja DOUBLE PRECISION NOT NULL,
+    pesanan_terakhir JSON NOT NULL,
+    pesanan_terakhir_pada TIMESTAMP WITHOUT TIME ZONE,
+    updated_at TIMESTAMP WITHOUT TIME ZONE
+);
+
+-- Newest orders per customer for the summary refresh, and GET /api/pelanggan/{id}/pesanan?detail=true
+-- If this build is interrupted the file stays unrecorded and the INVALID index it leaves is
+-- dropped by app.core.migrations before the file is run again, so IF NOT EXISTS cannot skip it.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_pesanan_pelanggan_id_id ON pesanan (pelanggan_id, id);
+
+ANALYZE pesanan;